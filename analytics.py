@@ -0,0 +1,135 @@
+"""Rollups of the review ratings by Division/Department/Class and age.
+
+The CSV is loaded with compact dtypes (categoricals and small integers, the
+free text left out) and aggregated once at the finest grouping: division,
+department, class and age bucket. Every coarser rollup is derived from those
+sums and counts, and they are cached in ``.analytics-cache`` under a hash of
+the input files and of this module, so repeated runs skip the CSV entirely.
+"""
+
+import argparse
+import hashlib
+import os
+
+import pandas as pd
+
+GROUPS = ["Division Name", "Department Name", "Class Name", "Age Group"]
+AGE_BINS = [0, 24, 34, 44, 54, 64, 200]
+AGE_LABELS = ["<25", "25-34", "35-44", "45-54", "55-64", "65+"]
+
+DTYPES = {
+    "Review ID": "int32",
+    "Clothing ID": "int16",
+    "Age": "int8",
+    "Rating": "int8",
+    "Recommended IND": "int8",
+    "Positive Feedback Count": "int16",
+    "Division Name": "category",
+    "Department Name": "category",
+    "Class Name": "category",
+}
+
+# Fine-grained sums; means are recomputed from them at every level
+_SUMS = {
+    "reviews": ("Review ID", "size"),
+    "rating_sum": ("Rating", "sum"),
+    "recommended_sum": ("Recommended IND", "sum"),
+    "feedback_sum": ("Positive Feedback Count", "sum"),
+}
+_SENTIMENT_SUMS = {
+    "labelled": ("sentiment", "count"),
+    "positive_sum": ("positive", "sum"),
+    "negative_sum": ("negative", "sum"),
+}
+
+
+def load(path: str, labels: str | None = None) -> pd.DataFrame:
+    """The CSV with compact dtypes, joined with ``reviews.py`` labels if given."""
+    frame = pd.read_csv(path, usecols=list(DTYPES), dtype=DTYPES)
+    frame["Age Group"] = pd.cut(frame["Age"], AGE_BINS, labels=AGE_LABELS)
+    if labels:
+        sentiment = pd.read_parquet(labels, columns=["review_id", "sentiment"])
+        sentiment["review_id"] = sentiment["review_id"].astype("int32")
+        frame = frame.merge(
+            sentiment, how="left", left_on="Review ID", right_on="review_id"
+        )
+        frame["positive"] = (frame["sentiment"] == "positive").astype("int8")
+        frame["negative"] = (frame["sentiment"] == "negative").astype("int8")
+    return frame
+
+
+def aggregate(frame: pd.DataFrame) -> pd.DataFrame:
+    """Sums and counts per division, department, class and age group."""
+    sums = dict(_SUMS)
+    if "sentiment" in frame:
+        sums.update(_SENTIMENT_SUMS)
+    grouped = frame.groupby(GROUPS, observed=True, dropna=False)
+    return grouped.agg(**sums).reset_index()
+
+
+def rollup(sums: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """Counts and means grouped by ``by``, a subset of ``GROUPS``."""
+    totals = sums.groupby(by, observed=True, dropna=False).sum(numeric_only=True)
+    result = pd.DataFrame({"reviews": totals["reviews"]})
+    result["rating"] = totals["rating_sum"] / totals["reviews"]
+    result["recommended"] = totals["recommended_sum"] / totals["reviews"]
+    result["positive_feedback"] = totals["feedback_sum"] / totals["reviews"]
+    if "labelled" in totals:
+        result["positive"] = totals["positive_sum"] / totals["labelled"]
+        result["negative"] = totals["negative_sum"] / totals["labelled"]
+    return result
+
+
+def _digest(paths: list[str]) -> str:
+    # This module's code too, so editing the bins, dtypes or sums invalidates it
+    with open(__file__, "rb") as file:
+        digest = hashlib.sha256(file.read())
+    for path in paths:
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def summary(
+    path: str, labels: str | None = None, cache: str | None = ".analytics-cache"
+) -> pd.DataFrame:
+    """``aggregate`` of ``load``, cached under the hash of the inputs and code."""
+    if cache is None:
+        return aggregate(load(path, labels))
+    digest = _digest([path] + ([labels] if labels else []))
+    cached = os.path.join(cache, f"{digest}.parquet")
+    if os.path.exists(cached):
+        return pd.read_parquet(cached)
+    sums = aggregate(load(path, labels))
+    os.makedirs(cache, exist_ok=True)
+    sums.to_parquet(cached + ".tmp", index=False)
+    os.replace(cached + ".tmp", cached)
+    return sums
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="reviews CSV")
+    parser.add_argument("--labels", help="Parquet written by reviews.py")
+    parser.add_argument(
+        "--by",
+        action="append",
+        choices=GROUPS,
+        help="grouping column; repeat for several (default: each one in turn)",
+    )
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    sums = summary(
+        args.source, args.labels, None if args.no_cache else ".analytics-cache"
+    )
+    with pd.option_context(
+        "display.width", 120, "display.max_columns", None, "display.precision", 2
+    ):
+        for by in [args.by] if args.by else [[group] for group in GROUPS]:
+            print(rollup(sums, by), end="\n\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Run the course scripts through the Batch API instead of synchronous calls.
+
+1. Export: with ``OPENAI_BATCH_EXPORT=batch.jsonl`` every completions and
+   chat completions call is written to a batch input file and answered with a
+   placeholder. Its ``custom_id`` is the calling line (``script.py:42-0``, the
+   suffix counting repeated calls from the same line, e.g. in a loop); async
+   calls are named after a hash of their request instead
+   (``request-<hash>-0``). The file is rewritten on each run.
+2. Run the file: ``python batch.py submit batch.jsonl`` and later
+   ``python batch.py download <batch ids> -o results.jsonl``, or
+   ``python batch.py local batch.jsonl -o results.jsonl`` against any
+   OpenAI-compatible server such as ``mock_openai.py``.
+3. Import: re-run the script with ``OPENAI_BATCH_IMPORT=results.jsonl``; each
+   call gets the result recorded for its ``custom_id``.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import Counter, defaultdict
+
+import httpx
+import openai
+from openai import OpenAI
+
+from middleware import Middleware, endpoint, json_response, request_json
+
+BATCHABLE = {"/chat/completions", "/completions"}
+
+# Frames from these places are helpers, not call sites
+_HELPERS = os.path.dirname(os.path.abspath(__file__))
+_LIBRARIES = tuple(
+    os.path.dirname(os.path.abspath(module.__file__)) + os.sep
+    for module in (httpx, openai)
+)
+
+
+class CallSites:
+    """Names calls after the script line that made them."""
+
+    def __init__(self):
+        self._counts: Counter[str] = Counter()
+        self._last: dict[tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def custom_id(
+        self, body: dict, asynchronous: bool = False, retry: bool = False
+    ) -> str:
+        """The call's ``custom_id``; a ``retry`` gets its first attempt's."""
+        frame = None if asynchronous else sys._getframe(1)
+        while frame is not None:
+            path = os.path.abspath(frame.f_code.co_filename)
+            if os.path.dirname(path) != _HELPERS and not path.startswith(_LIBRARIES):
+                break
+            frame = frame.f_back
+        if frame is None:
+            # Tasks run in any order, so name async calls after their request;
+            # equal requests get the same results whichever order they run in
+            canonical = json.dumps(body, sort_keys=True).encode()
+            site = "request-" + hashlib.sha256(canonical).hexdigest()[:16]
+        else:
+            site = f"{os.path.relpath(frame.f_code.co_filename)}:{frame.f_lineno}"
+        key = (site, threading.get_ident())
+        with self._lock:
+            if retry and key in self._last:
+                return self._last[key]
+            count = self._counts[site]
+            self._counts[site] += 1
+            self._last[key] = f"{site}-{count}"
+            return self._last[key]
+
+
+def _retry(request: httpx.Request) -> bool:
+    """Whether the SDK is retrying ``request`` after a failed attempt."""
+    return request.headers.get("x-stainless-retry-count", "0") not in ("", "0")
+
+
+def placeholder(path: str, body: dict, custom_id: str) -> dict:
+    text = f"<batched {custom_id}>"
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    if path == "/completions":
+        choice = {"index": 0, "text": text, "logprobs": None, "finish_reason": "stop"}
+        kind = "text_completion"
+    else:
+        message = {"role": "assistant", "content": text}
+        choice = {"index": 0, "message": message, "finish_reason": "stop"}
+        kind = "chat.completion"
+    return {
+        "id": custom_id,
+        "object": kind,
+        "created": 0,
+        "model": body.get("model", ""),
+        "choices": [choice],
+        "usage": usage,
+    }
+
+
+# Call sites per batch file, shared by every client in this process so that
+# custom_ids stay unique; an export file is truncated when first added here
+_sites: dict[tuple[str, str], CallSites] = {}
+_sites_lock = threading.Lock()
+
+
+def _shared_sites(kind: str, path: str) -> tuple[CallSites, bool]:
+    """The ``CallSites`` for ``path`` and whether they were just created."""
+    key = (kind, os.path.abspath(path))
+    with _sites_lock:
+        created = key not in _sites
+        if created:
+            _sites[key] = CallSites()
+        return _sites[key], created
+
+
+class ExportMiddleware(Middleware):
+    """Writes batchable requests to ``path`` instead of sending them.
+
+    The first client of a process truncates the file, so re-running a script
+    does not append to the last run's requests.
+    """
+
+    def __init__(self, inner, path: str):
+        super().__init__(inner)
+        self.path = path
+        self.sites, created = _shared_sites("export", path)
+        if created:
+            open(path, "w", encoding="utf-8").close()
+
+    def _export(
+        self, request: httpx.Request, asynchronous: bool = False
+    ) -> httpx.Response | None:
+        path = endpoint(request)
+        body = request_json(request)
+        if request.method != "POST" or path not in BATCHABLE or body is None:
+            return None
+        custom_id = self.sites.custom_id(body, asynchronous, _retry(request))
+        line = {"custom_id": custom_id, "method": "POST", "url": "/v1" + path}
+        line["body"] = body
+        with _sites_lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(line) + "\n")
+        return json_response(request, placeholder(path, body, custom_id))
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._export(request) or self.inner.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = self._export(request, asynchronous=True)
+        return response or await self.inner.handle_async_request(request)
+
+
+class ImportMiddleware(Middleware):
+    """Answers batchable requests with the batch results in ``path``."""
+
+    def __init__(self, inner, path: str):
+        super().__init__(inner)
+        self.sites, _ = _shared_sites("import", path)
+        self.results: dict[str, dict] = {}
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                result = json.loads(line)
+                self.results[result["custom_id"]] = result
+
+    def _import(
+        self, request: httpx.Request, asynchronous: bool = False
+    ) -> httpx.Response | None:
+        body = request_json(request)
+        if request.method != "POST" or endpoint(request) not in BATCHABLE:
+            return None
+        # The SDK retries errored results; a retry must not advance the count
+        custom_id = self.sites.custom_id(body or {}, asynchronous, _retry(request))
+        result = self.results.get(custom_id)
+        if result is None:
+            return None
+        if result.get("error"):
+            return json_response(request, {"error": result["error"]}, status=500)
+        response = result["response"]
+        return json_response(request, response["body"], response["status_code"])
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._import(request) or self.inner.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = self._import(request, asynchronous=True)
+        return response or await self.inner.handle_async_request(request)
+
+
+def submit(client: OpenAI, path: str) -> list[str]:
+    """Upload ``path`` and start one batch per endpoint; return the batch ids."""
+    groups: defaultdict[str, list[str]] = defaultdict(list)
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            groups[json.loads(line)["url"]].append(line)
+    batch_ids = []
+    for url, lines in groups.items():
+        upload = client.files.create(
+            file=(os.path.basename(path), "".join(lines).encode()), purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=upload.id, endpoint=url, completion_window="24h"
+        )
+        batch_ids.append(batch.id)
+    return batch_ids
+
+
+def download(client: OpenAI, batch_ids: list[str], path: str) -> None:
+    """Write the results of finished batches to ``path``."""
+    with open(path, "w", encoding="utf-8") as file:
+        for batch_id in batch_ids:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status != "completed":
+                raise RuntimeError(f"Batch {batch_id} is {batch.status}")
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    file.write(client.files.content(file_id).text)
+
+
+def run_local(client: OpenAI, source: str, path: str) -> None:
+    """Execute a batch input file synchronously, writing batch output lines."""
+    with open(source, encoding="utf-8") as lines, open(
+        path, "w", encoding="utf-8"
+    ) as file:
+        for line in lines:
+            request = json.loads(line)
+            url = request["url"].removeprefix("/v1")
+            response = client.post(url, body=request["body"], cast_to=httpx.Response)
+            result = {
+                "id": f"batch_req_{request['custom_id']}",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": response.status_code,
+                    "body": response.json(),
+                },
+                "error": None,
+            }
+            file.write(json.dumps(result) + "\n")
+
+
+def main() -> None:
+    from clients import get_client
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_submit = commands.add_parser("submit", help=submit.__doc__)
+    parser_submit.add_argument("source")
+    parser_download = commands.add_parser("download", help=download.__doc__)
+    parser_download.add_argument("batch_ids", nargs="+")
+    parser_download.add_argument("-o", "--output", default="results.jsonl")
+    parser_local = commands.add_parser("local", help=run_local.__doc__)
+    parser_local.add_argument("source")
+    parser_local.add_argument("-o", "--output", default="results.jsonl")
+    parser_local.add_argument("--base-url", default="http://127.0.0.1:8000/v1")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        print(" ".join(submit(get_client(middleware=()), args.source)))
+    elif args.command == "download":
+        download(get_client(middleware=()), args.batch_ids, args.output)
+    else:
+        client = get_client(api_key="local", base_url=args.base_url, middleware=())
+        run_local(client, args.source, args.output)
+
+
+if __name__ == "__main__":
+    main()
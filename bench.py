@@ -0,0 +1,419 @@
+"""Benchmarks against the local mock server (``mock_openai.py``).
+
+``` sh
+python bench.py chat --requests 50 --latency 0.2 --concurrency 16
+python bench.py moderation --inputs 500 --latency 0.05
+python bench.py ratelimit --requests 200 --rpm 50 --window 1
+python bench.py replay --scale 10 --baseline bench-replay.json -o new.json
+python bench.py prompts --requests 50
+```
+
+``replay`` runs the mock server in a subprocess so that CPU time and peak
+RSS are the client's own.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import chat
+import clients
+import mock_openai
+import moderation
+import prompts
+import scheduler
+import telemetry
+import workload
+from reviews import read_reviews
+
+REVIEWS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "2026/womens_clothing_e-commerce_reviews.csv",
+)
+
+
+def bench_chat(args: argparse.Namespace) -> None:
+    """Sequential ``get_response`` loop versus ``get_responses``."""
+    server, base_url = mock_openai.serve(latency=args.latency)
+    prompts = [f"Prompt number {i}" for i in range(args.requests)]
+    try:
+        client = clients.get_client(api_key="mock", base_url=base_url)
+        start = time.perf_counter()
+        sequential = [chat.get_response(p, client=client) for p in prompts]
+        sequential_time = time.perf_counter() - start
+
+        async def concurrent() -> list[str]:
+            async_client = clients.get_async_client(api_key="mock", base_url=base_url)
+            return await chat.aget_responses(
+                prompts, concurrency=args.concurrency, client=async_client
+            )
+
+        start = time.perf_counter()
+        batched = asyncio.run(concurrent())
+        concurrent_time = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    assert batched == sequential
+    for name, elapsed in (
+        ("sequential", sequential_time),
+        ("get_responses", concurrent_time),
+    ):
+        print(f"{name:>14}: {elapsed:6.2f}s  {len(prompts) / elapsed:7.1f} req/s")
+    print(f"{'speed-up':>14}: {sequential_time / concurrent_time:6.1f}x")
+    print(f"{'connections':>14}: {clients.stats}")
+
+
+def bench_moderation(args: argparse.Namespace) -> None:
+    """One moderation call per input versus ``ModerationGate``."""
+    server, base_url = mock_openai.serve(latency=args.latency)
+    texts = [text for _, text in read_reviews(args.source) if text]
+    texts = (texts * (args.inputs // len(texts) + 1))[: args.inputs]
+    try:
+        client = clients.get_client(api_key="mock", base_url=base_url)
+        start = time.perf_counter()
+        single = [
+            client.moderations.create(model=moderation.MODEL, input=text)
+            .results[0]
+            .flagged
+            for text in texts
+        ]
+        timings = [("one per input", time.perf_counter() - start)]
+
+        gate = moderation.ModerationGate(client, batch_size=args.batch_size)
+        for name in ("gate (cold)", "gate (warm)"):
+            start = time.perf_counter()
+            verdicts = gate.check(texts)
+            timings.append((name, time.perf_counter() - start))
+    finally:
+        server.shutdown()
+
+    disagreements = sum(v.flagged != f for v, f in zip(verdicts, single))
+    # Flagged by the endpoint but passed by the local pre-filter
+    missed = sum(f and v.source == "local" for v, f in zip(verdicts, single))
+    for name, elapsed in timings:
+        print(f"{name:>14}: {elapsed:6.2f}s  {len(texts) / elapsed:9.1f} inputs/s")
+    print(
+        f"{'gate':>14}: {dict(gate.stats)}, {disagreements} disagreements, "
+        f"{missed} missed by the local pre-filter"
+    )
+
+
+def bench_ratelimit(args: argparse.Namespace) -> None:
+    """Unscheduled burst versus ``SchedulerMiddleware`` under rate limits."""
+    server, base_url = mock_openai.serve(
+        latency=args.latency, rpm=args.rpm, window=args.window
+    )
+
+    async def run(middleware: tuple) -> dict:
+        client = clients.get_async_client(
+            api_key="mock", base_url=base_url, middleware=middleware
+        )
+        latencies: dict[str, list[float]] = {"batch": [], "interactive": []}
+
+        async def call(i: int, priority: str) -> None:
+            start = time.perf_counter()
+            await client.chat.completions.create(
+                model=chat.MODEL,
+                messages=[{"role": "user", "content": f"Prompt number {i}"}],
+            )
+            latencies[priority].append(time.perf_counter() - start)
+
+        async def interactive(i: int) -> None:
+            # Arrive while the batch is queued behind the limit
+            await asyncio.sleep(args.window * (1 + i / args.interactive))
+            await call(i, "interactive")
+
+        start = time.perf_counter()
+        with scheduler.batch():
+            batch = [
+                asyncio.ensure_future(call(i, "batch")) for i in range(args.requests)
+            ]
+        users = [interactive(i) for i in range(args.interactive)]
+        results = await asyncio.gather(*batch, *users, return_exceptions=True)
+        return {
+            "elapsed": time.perf_counter() - start,
+            "failed": sum(isinstance(r, Exception) for r in results),
+            "latencies": latencies,
+        }
+
+    try:
+        runs = [
+            ("unscheduled", asyncio.run(run(()))),
+            ("scheduled", asyncio.run(run((scheduler.SchedulerMiddleware,)))),
+        ]
+    finally:
+        server.shutdown()
+
+    total = args.requests + args.interactive
+    print(f"{'limit':>12}: {args.rpm / args.window:8.1f} req/s")
+    for name, result in runs:
+        done = total - result["failed"]
+        waits = result["latencies"]["interactive"] or [float("nan")]
+        print(
+            f"{name:>12}: {result['elapsed']:6.2f}s  {done / result['elapsed']:8.1f} "
+            f"req/s  {result['failed']:4d} failed  interactive p50 "
+            f"{statistics.median(waits) * 1000:7.1f}ms"
+        )
+
+
+def _silence(seconds: float = 1.0) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as audio:
+        audio.setparams((1, 2, 8000, int(8000 * seconds), "NONE", "not compressed"))
+        audio.writeframes(b"\0\0" * int(8000 * seconds))
+    return buffer.getvalue()
+
+
+def _replay(client, request: dict, audio: bytes) -> float:
+    """Send one workload request; return its latency in seconds."""
+    endpoint, body = request["endpoint"], dict(request["body"])
+    start = time.perf_counter()
+    if endpoint == "/completions":
+        client.completions.create(**body)
+    elif endpoint == "/chat/completions":
+        client.chat.completions.create(**body)
+    elif endpoint == "/moderations":
+        client.moderations.create(**body)
+    else:
+        body["file"] = (os.path.basename(body.get("file", "audio.wav")), audio)
+        if endpoint == "/audio/translations":
+            client.audio.translations.create(**body)
+        else:
+            client.audio.transcriptions.create(**body)
+    return time.perf_counter() - start
+
+
+def _commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+    )
+    return result.stdout.strip() or None
+
+
+def _format(value: float | None, spec: str) -> str:
+    """``value`` in an 8-wide column, or n/a when there was nothing to measure."""
+    return f"{'n/a':>8}" if value is None else format(value, spec)
+
+
+def _change(value: float | None, baseline: float | None) -> float | None:
+    if value is None or not baseline:
+        return None
+    return value / baseline - 1
+
+
+def bench_replay(args: argparse.Namespace) -> None:
+    """The course scripts' requests, sequentially, concurrently and scaled up."""
+    if args.workload:
+        with open(args.workload, encoding="utf-8") as file:
+            requests = [json.loads(line) for line in file if line.strip()]
+    else:
+        requests = workload.load()
+    audio = _silence()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-u",
+            os.path.join(os.path.dirname(__file__), "mock_openai.py"),
+        ]
+        + ["--port", "0", "--latency", str(args.latency)]
+        + ["--distribution", args.distribution, "--seed", str(args.seed)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    modes = {
+        "sequential": (requests, 1),
+        "concurrent": (requests, args.concurrency),
+        f"scaled x{args.scale}": (requests * args.scale, args.concurrency),
+    }
+    results = {}
+    try:
+        base_url = server.stdout.readline().split()[-1]
+        client = clients.get_client(api_key="mock", base_url=base_url)
+        for name, (batch, concurrency) in modes.items():
+
+            def timed(request: dict) -> float | None:
+                try:
+                    return _replay(client, request, audio)
+                except Exception:
+                    return None
+
+            cpu, start = time.process_time(), time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed, batch))
+            failed = latencies.count(None)
+            latencies = [t for t in latencies if t is not None]
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            # quantiles() needs two points; report n/a rather than fail the run
+            cuts = [None] * 99
+            if len(latencies) >= 2:
+                cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+                cuts = [cut * 1000 for cut in cuts]
+            results[name] = {
+                "requests": len(batch),
+                "failed": failed,
+                "concurrency": concurrency,
+                "elapsed": elapsed,
+                "requests_per_second": len(batch) / elapsed,
+                "p50_ms": cuts[49],
+                "p95_ms": cuts[94],
+                "p99_ms": cuts[98],
+                "cpu_seconds": cpu,
+                "cpu_ms_per_request": cpu / len(batch) * 1000,
+                # ru_maxrss is in kilobytes on Linux; the peak so far
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+            }
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "workload": len(requests),
+        "latency": args.latency,
+        "distribution": args.distribution,
+        "modes": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["modes"]
+    print(
+        f"{'':>14}  {'req/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  "
+        f"{'CPU ms/req':>10}  {'RSS MB':>7}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:>14}  {result['requests_per_second']:8.1f}  "
+            + "".join(
+                f"{_format(result[key], '8.1f')}  "
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+            + f"{result['cpu_ms_per_request']:10.2f}  "
+            f"{result['peak_rss_mb']:7.1f}"
+            + (f"  {result['failed']} failed" if result["failed"] else "")
+        )
+        if name in baseline:
+            changes = [
+                _change(result[key], baseline[name][key])
+                for key in ("requests_per_second", "p50_ms", "p95_ms", "p99_ms")
+            ]
+            cpu = result["cpu_ms_per_request"] / baseline[name]["cpu_ms_per_request"]
+            print(
+                f"{'change':>14}  "
+                + "  ".join(_format(change, "+8.0%") for change in changes)
+                + f"  {cpu - 1:+10.0%}"
+            )
+    print(f"Saved to {args.output}")
+
+
+def bench_prompts(args: argparse.Namespace) -> None:
+    """Prompt-cache hits with the question spliced in versus a compiled template."""
+    server, base_url = mock_openai.serve(latency=args.latency)
+    base = "You are the customer support chatbot for an electronics shop. "
+    conditions = " ".join(
+        f"Rule {i}: if the user asks about topic {i}, answer from policy {i}."
+        for i in range(args.rules)
+    )
+    questions = [f"Question {i}: where is order {i}?" for i in range(args.requests)]
+    compiled = prompts.template(base, prompts.Slot("question"), conditions)
+    variants = {
+        "spliced": lambda q: [{"role": "user", "content": base + q + conditions}],
+        "template": lambda q: compiled.messages(question=q),
+    }
+    try:
+        for name, build in variants.items():
+            metrics = telemetry.Metrics()
+            layer = partial(
+                telemetry.TelemetryMiddleware,
+                metrics=metrics,
+                sink=telemetry.MemorySink(),
+            )
+            client = clients.get_client(
+                api_key="mock", base_url=base_url, middleware=(layer,)
+            )
+            for question in questions:
+                client.chat.completions.create(
+                    model=chat.MODEL, messages=build(question), max_tokens=50
+                )
+            (row,) = prompts.cache_report(metrics)
+            print(
+                f"{name:>10}: {row['prompt_tokens']:8d} prompt tokens, "
+                f"{row['cached_tokens']:8d} cached ({row['hit_rate']:.0%}), "
+                f"${metrics.as_json()[0]['cost']:.4f}"
+            )
+    finally:
+        server.shutdown()
+    tokens = compiled.prefix_tokens(chat.MODEL)
+    print(
+        f"{'prefix':>10}: {tokens} tokens, cacheable: {compiled.cacheable(chat.MODEL)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_chat = commands.add_parser("chat", help=bench_chat.__doc__)
+    parser_chat.add_argument("--requests", type=int, default=50)
+    parser_chat.add_argument("--latency", type=float, default=0.2)
+    parser_chat.add_argument("--concurrency", type=int, default=16)
+    parser_chat.set_defaults(run=bench_chat)
+
+    parser_moderation = commands.add_parser("moderation", help=bench_moderation.__doc__)
+    parser_moderation.add_argument("--inputs", type=int, default=500)
+    parser_moderation.add_argument("--latency", type=float, default=0.05)
+    parser_moderation.add_argument("--batch-size", type=int, default=32)
+    parser_moderation.add_argument("--source", default=REVIEWS, help="reviews CSV")
+    parser_moderation.set_defaults(run=bench_moderation)
+
+    parser_ratelimit = commands.add_parser("ratelimit", help=bench_ratelimit.__doc__)
+    parser_ratelimit.add_argument("--requests", type=int, default=200)
+    parser_ratelimit.add_argument("--rpm", type=int, default=50)
+    parser_ratelimit.add_argument("--window", type=float, default=1.0)
+    parser_ratelimit.add_argument("--interactive", type=int, default=10)
+    parser_ratelimit.add_argument("--latency", type=float, default=0.05)
+    parser_ratelimit.set_defaults(run=bench_ratelimit)
+
+    parser_replay = commands.add_parser("replay", help=bench_replay.__doc__)
+    parser_replay.add_argument("--workload", help="JSONL from workload.py")
+    parser_replay.add_argument("--concurrency", type=int, default=16)
+    parser_replay.add_argument("--scale", type=int, default=10)
+    parser_replay.add_argument("--latency", type=float, default=0.05)
+    parser_replay.add_argument(
+        "--distribution", choices=mock_openai.DISTRIBUTIONS, default="lognormal"
+    )
+    parser_replay.add_argument("--seed", type=int, default=0)
+    parser_replay.add_argument("-o", "--output", default="bench-replay.json")
+    parser_replay.add_argument("--baseline", help="earlier JSON to compare with")
+    parser_replay.set_defaults(run=bench_replay)
+
+    parser_prompts = commands.add_parser("prompts", help=bench_prompts.__doc__)
+    parser_prompts.add_argument("--requests", type=int, default=50)
+    parser_prompts.add_argument("--rules", type=int, default=300)
+    parser_prompts.add_argument("--latency", type=float, default=0.0)
+    parser_prompts.set_defaults(run=bench_prompts)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Pre-flight token budgeting for chat and completion requests.
+
+The prompt-engineering scripts splice arbitrary text into templates such as
+``instructions + output_format + f"```{text}```"``. ``fit`` counts the
+prompt locally (with ``tiktoken`` when it is installed, otherwise about four
+characters per token) and, if it does not fit the model's context window,
+shortens the longest text between triple backticks, or else the longest
+message, at a word boundary. A shortened request without ``max_tokens``
+gets the room left in the window, so the reply cannot crowd it out again;
+other requests keep the caller's ``max_tokens``, or none, as the rate-limit
+scheduler reserves budget by it.
+
+``OPENAI_PREFLIGHT=truncate`` (or ``reject``) applies it to every request
+from ``clients.get_client``; requests that cannot fit are answered locally
+with a 400 ``context_length_exceeded`` error, without a round trip.
+"""
+
+import copy
+import json
+import re
+from functools import cache, lru_cache
+
+import httpx
+
+from middleware import Middleware, endpoint, json_response, request_json
+
+# Context window and maximum completion tokens, by model prefix
+LIMITS = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-3.5-turbo-instruct": (4096, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+}
+DEFAULT_LIMITS = (4096, 4096)
+
+# Tokens added by the chat format: per message, and to prime the reply
+MESSAGE_OVERHEAD = 3
+REPLY_OVERHEAD = 3
+
+_FENCED = re.compile(r"```(.*?)```", re.DOTALL)
+
+
+class PromptTooLong(ValueError):
+    """Raised when a prompt cannot be made to fit the context window."""
+
+
+def limits(model: str) -> tuple[int, int]:
+    prefixes = [prefix for prefix in LIMITS if model.startswith(prefix)]
+    return LIMITS[max(prefixes, key=len)] if prefixes else DEFAULT_LIMITS
+
+
+@cache
+def encoding(model: str):
+    """The model's BPE encoding, or ``None`` without ``tiktoken``."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=4096)
+def count(text: str, model: str) -> int:
+    """Tokens in ``text``; repeated template parts are counted once."""
+    bpe = encoding(model)
+    if bpe is None:
+        return (len(text) + 3) // 4
+    return len(bpe.encode(text, disallowed_special=()))
+
+
+def count_messages(messages: list[dict], model: str) -> int:
+    return REPLY_OVERHEAD + sum(
+        MESSAGE_OVERHEAD + count(str(m.get("content") or ""), model) for m in messages
+    )
+
+
+def truncate(text: str, tokens: int, model: str) -> str:
+    """``text`` cut to at most ``tokens`` tokens at a word boundary."""
+    if count(text, model) <= tokens:
+        return text
+    bpe = encoding(model)
+    if bpe is None:
+        cut = text[: max(tokens, 0) * 4]
+    else:
+        cut = bpe.decode(bpe.encode(text, disallowed_special=())[: max(tokens, 0)])
+    space = cut.rfind(" ")
+    return cut[:space] if space > len(cut) // 2 else cut
+
+
+def _shrink(content: str, excess: int, model: str) -> str:
+    """``content`` with ``excess`` tokens removed from its longest fenced text."""
+    fenced = max(_FENCED.finditer(content), key=lambda m: len(m[1]), default=None)
+    start, end = fenced.span(1) if fenced else (0, len(content))
+    inner = content[start:end]
+    keep = count(inner, model) - excess
+    if keep <= 0:
+        raise PromptTooLong(f"Prompt is {excess} tokens over the context window")
+    return content[:start] + truncate(inner, keep, model) + content[end:]
+
+
+def fit(body: dict, truncate_input: bool = True, min_completion: int = 256) -> dict:
+    """A copy of a chat or completions request body that fits its model.
+
+    At least ``min_completion`` tokens are left for the reply; if the prompt
+    had to be shortened, a missing ``max_tokens`` is set to what remains.
+    """
+    model = body.get("model", "")
+    window, max_output = limits(model)
+    body = copy.copy(body)
+    reply = body.get("max_tokens") or min_completion
+    if "messages" in body:
+        messages = [dict(m) for m in body["messages"]]
+        used = count_messages(messages, model)
+    else:
+        prompt = str(body.get("prompt", ""))
+        used = count(prompt, model)
+    excess = used + reply - window
+    shortened = excess > 0
+    if shortened and not truncate_input:
+        raise PromptTooLong(
+            f"Prompt of {used} tokens plus {reply} for the reply exceeds "
+            f"the {window}-token context window of {model}"
+        )
+    # Cutting at a word boundary can re-tokenize slightly longer; retry then
+    for _ in range(3):
+        if excess <= 0:
+            break
+        if "messages" in body:
+            longest = max(
+                (m for m in messages if isinstance(m.get("content"), str)),
+                key=lambda m: len(m["content"]),
+                default=None,
+            )
+            if longest is None:
+                raise PromptTooLong("No text to shorten in the prompt")
+            longest["content"] = _shrink(longest["content"], excess, model)
+            used = count_messages(messages, model)
+        else:
+            prompt = _shrink(prompt, excess, model)
+            used = count(prompt, model)
+        excess = used + reply - window
+    if excess > 0:
+        raise PromptTooLong(f"Prompt is {excess} tokens over the context window")
+    if "messages" in body:
+        body["messages"] = messages
+    else:
+        body["prompt"] = prompt
+    if shortened and not body.get("max_tokens"):
+        body["max_tokens"] = max(1, min(max_output, window - used))
+    return body
+
+
+class PreflightMiddleware(Middleware):
+    """Applies ``fit`` to chat and completions requests before they are sent."""
+
+    def __init__(self, inner, truncate_input: bool = True):
+        super().__init__(inner)
+        self.truncate_input = truncate_input
+
+    def _prepare(self, request: httpx.Request) -> httpx.Request | httpx.Response:
+        body = request_json(request)
+        if (
+            request.method != "POST"
+            or endpoint(request) not in ("/chat/completions", "/completions")
+            or not isinstance(body, dict)
+            or isinstance(body.get("prompt"), list)
+        ):
+            return request
+        try:
+            fitted = fit(body, self.truncate_input)
+        except PromptTooLong as error:
+            payload = {
+                "error": {
+                    "message": str(error),
+                    "type": "invalid_request_error",
+                    "code": "context_length_exceeded",
+                }
+            }
+            return json_response(request, payload, status=400)
+        if fitted == body:
+            return request
+        headers = {
+            k: v for k, v in request.headers.items() if k.lower() != "content-length"
+        }
+        return httpx.Request(
+            request.method,
+            request.url,
+            headers=headers,
+            content=json.dumps(fitted).encode(),
+            extensions=request.extensions,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        prepared = self._prepare(request)
+        if isinstance(prepared, httpx.Response):
+            return prepared
+        return self.inner.handle_request(prepared)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        prepared = self._prepare(request)
+        if isinstance(prepared, httpx.Response):
+            return prepared
+        return await self.inner.handle_async_request(prepared)
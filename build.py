@@ -0,0 +1,167 @@
+"""Rebuild course folders: scrape.html → notebook.Rmd → notebook.ipynb and
+script.py.
+
+Each stage records a hash of its input and of the converter's code in
+``.build.json`` and is skipped while its output exists and that hash is
+unchanged. Outputs that exist without an entry in ``.build.json`` (such as
+the checked-in notebooks) are only overwritten with ``--force``. Course
+folders are independent and are built in parallel.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+
+import convert
+
+MANIFEST = ".build.json"
+
+
+def convert_html(source: str, directory: str) -> None:
+    convert.write(convert.read_html(source), directory)
+
+
+def convert_rmd(source: str, directory: str) -> None:
+    convert.write(convert.read_rmd(source), directory, with_rmd=False)
+
+
+@cache
+def code_hash() -> bytes:
+    """Hash of the converter's code, so editing it invalidates every output."""
+    digest = hashlib.sha256()
+    for path in (convert.__file__, __file__):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.digest()
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    source: str
+    targets: tuple[str, ...]
+    action: Callable[[str, str], None]
+
+    def key(self, directory: str) -> str:
+        """Hash of the stage's recipe, the converter's code and the input."""
+        digest = hashlib.sha256(self.action.__qualname__.encode() + code_hash())
+        with open(os.path.join(directory, self.source), "rb") as file:
+            for block in iter(lambda: file.read(1 << 16), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+STAGES = [
+    Stage(
+        "convert",
+        "scrape.html",
+        ("notebook.Rmd", "notebook.ipynb", "script.py"),
+        convert_html,
+    ),
+    Stage("notebook", "notebook.Rmd", ("notebook.ipynb", "script.py"), convert_rmd),
+]
+
+
+def build(directory: str, force: bool = False) -> list[tuple[str, str]]:
+    """Run the stale stages of one course folder.
+
+    Returns ``(stage, status)`` pairs, status being ``built``, ``fresh``,
+    ``skipped`` (no input) or ``kept`` (outputs not made by this script).
+    """
+    path = os.path.join(directory, MANIFEST)
+    try:
+        with open(path, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        manifest = {}
+
+    report = []
+    remade: set[str] = set()
+    try:
+        for index, stage in enumerate(STAGES):
+            source = os.path.join(directory, stage.source)
+            if not os.path.exists(source):
+                report.append((stage.name, "skipped"))
+                continue
+            if stage.name in remade:
+                report.append((stage.name, "fresh"))
+                continue
+            key = stage.key(directory)
+            existing = [
+                os.path.exists(os.path.join(directory, target))
+                for target in stage.targets
+            ]
+            if not force and manifest.get(stage.name) == key and all(existing):
+                report.append((stage.name, "fresh"))
+                continue
+            if not force and stage.name not in manifest and any(existing):
+                report.append((stage.name, "kept"))
+                continue
+            stage.action(source, directory)
+            manifest[stage.name] = key
+            report.append((stage.name, "built"))
+            # Later stages that only remake this stage's outputs from one of
+            # them are up to date now
+            for later in STAGES[index + 1 :]:
+                if later.source in stage.targets and set(later.targets) <= set(
+                    stage.targets
+                ):
+                    manifest[later.name] = later.key(directory)
+                    remade.add(later.name)
+    finally:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+    return report
+
+
+def courses(root: str = ".") -> list[str]:
+    """Course folders under ``root``: those with a notebook.Rmd or scrape.html."""
+    return sorted(
+        entry.path
+        for entry in os.scandir(root)
+        if entry.is_dir()
+        and any(
+            os.path.exists(os.path.join(entry.path, name))
+            for name in ("scrape.html", "notebook.Rmd")
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("directories", nargs="*", help="default: all course folders")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild every stage, overwriting outputs not made by this script",
+    )
+    args = parser.parse_args()
+
+    directories = args.directories or courses()
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {d: pool.submit(build, d, args.force) for d in directories}
+        for directory, future in futures.items():
+            try:
+                report = future.result()
+            except Exception as error:
+                print(
+                    f"{directory}: failed: {type(error).__name__}: {error}",
+                    file=sys.stderr,
+                )
+                failed = True
+                continue
+            for stage, status in report:
+                print(f"{directory}: {stage} {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
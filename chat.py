@@ -0,0 +1,182 @@
+"""Chat completion helpers for the course scripts.
+
+``get_responses`` sends many prompts concurrently and returns the replies in
+input order, within a concurrency cap and requests/tokens-per-minute budgets.
+``stream_response`` yields a reply as it is generated and records its
+time to first token and throughput.
+"""
+
+import asyncio
+import time
+from collections.abc import Iterator
+
+from openai import AsyncOpenAI, OpenAI
+
+from clients import get_async_client, get_client, run
+from telemetry import Sink, default_sink
+
+MODEL = "gpt-3.5-turbo"
+
+# A prompt is either the user message or the full list of messages
+Prompt = str | list[dict[str, str]]
+
+
+def messages_for(prompt: Prompt) -> list[dict[str, str]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return prompt
+
+
+def estimate_tokens(messages: list[dict[str, str]]) -> int:
+    """Rough prompt size: about four characters per token."""
+    return sum(4 + len(m.get("content") or "") // 4 for m in messages)
+
+
+class TokenBucket:
+    """Allows ``rate`` units per minute, with bursts of up to ``rate``."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.level = rate
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        now = time.monotonic()
+        self.level = min(self.rate, self.level + (now - self.updated) * self.rate / 60)
+        self.updated = now
+        amount = min(amount, self.rate)
+        if self.level >= amount:
+            self.level -= amount
+            return 0.0
+        return (amount - self.level) * 60 / self.rate
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets shared by callers."""
+
+    def __init__(self, rpm: float | None = None, tpm: float | None = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        async with self._lock:
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                while bucket is not None:
+                    delay = bucket.wait_time(amount)
+                    if not delay:
+                        break
+                    await asyncio.sleep(delay)
+
+
+async def aget_responses(
+    prompts: list[Prompt],
+    model: str = MODEL,
+    temperature: float = 0,
+    max_tokens: int | None = None,
+    concurrency: int = 8,
+    rpm: float | None = None,
+    tpm: float | None = None,
+    client: AsyncOpenAI | None = None,
+) -> list[str]:
+    client = client or get_async_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rpm, tpm)
+    options = {} if max_tokens is None else {"max_tokens": max_tokens}
+
+    async def complete(prompt: Prompt) -> str:
+        messages = messages_for(prompt)
+        async with semaphore:
+            await limiter.acquire(estimate_tokens(messages) + (max_tokens or 0))
+            response = await client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **options
+            )
+        return response.choices[0].message.content
+
+    return await asyncio.gather(*(complete(prompt) for prompt in prompts))
+
+
+def get_responses(prompts: list[Prompt], **kwargs) -> list[str]:
+    """Concurrent ``get_response`` over ``prompts``, in input order.
+
+    Takes the keyword arguments of ``aget_responses``; await that instead
+    where an event loop is already running, as in Jupyter.
+    """
+    return run(aget_responses, prompts, **kwargs)
+
+
+def get_response(
+    prompt: Prompt,
+    model: str = MODEL,
+    temperature: float = 0,
+    client: OpenAI | None = None,
+) -> str:
+    client = client or get_client()
+    response = client.chat.completions.create(
+        model=model, messages=messages_for(prompt), temperature=temperature
+    )
+    return response.choices[0].message.content
+
+
+def stream_response(
+    prompt: Prompt,
+    model: str = MODEL,
+    temperature: float = 0,
+    max_tokens: int | None = None,
+    client: OpenAI | None = None,
+    sink: Sink | None = None,
+) -> Iterator[str]:
+    """Yield the reply to ``prompt`` piece by piece as it streams in.
+
+    Once the stream ends, a ``chat.stream`` record with ``ttft``, ``latency``
+    (seconds), ``completion_tokens`` and ``tokens_per_second`` is written to
+    ``sink`` (default: ``telemetry.default_sink()``). If the caller stops
+    early (``break`` or Ctrl-C), closing the generator closes the response
+    and the record is written with ``partial`` set.
+    """
+    client = client or get_client()
+    sink = sink or default_sink()
+    options = {} if max_tokens is None else {"max_tokens": max_tokens}
+    timestamp = time.time()
+    start = time.perf_counter()
+    first = None
+    chunks = 0
+    usage = None
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages_for(prompt),
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+        **options,
+    )
+    finished = False
+    try:
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if first is None:
+                first = time.perf_counter()
+            chunks += 1
+            yield chunk.choices[0].delta.content
+        finished = True
+    finally:
+        # Also reached when the caller stops early; free the connection
+        stream.close()
+        end = time.perf_counter()
+        tokens = usage.completion_tokens if usage else chunks
+        generating = end - (first or end)
+        sink.write(
+            {
+                "kind": "chat.stream",
+                "model": model,
+                "timestamp": timestamp,
+                "ttft": (first or end) - start,
+                "latency": end - start,
+                "completion_tokens": tokens,
+                "tokens_per_second": tokens / generating if generating else 0.0,
+                "partial": not finished,
+            }
+        )
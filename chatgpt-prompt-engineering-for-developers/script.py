@@ -1,5 +1,11 @@
+import sys
+
+# clients.py is in the repository root, one folder up
+sys.path.append("..")
+from clients import get_client
+
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 def get_response(prompt):
   # Create a request to the chat completions endpoint
@@ -15,7 +21,7 @@ response = get_response("Write a poem about ChatGPT")
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt that follows the instructions
 prompt = "Write a poem about ChatGPT. Use basic English that a child can understand."
@@ -26,7 +32,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a prompt that completes the story
 prompt = f"""Complete the story delimited by triple backticks. 
@@ -39,7 +45,7 @@ print("\n Original story: \n", story)
 print("\n Generated story: \n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to complete the story
 prompt = f"""Complete the story delimited by triple backticks with only two paragraphs using the style of William Shakespeare. 
@@ -52,7 +58,7 @@ print("\n Original story: \n", story)
 print("\n Generated story: \n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a prompt that generates the table
 prompt = "Generate a table containing 10 books I should read if I am a sci-fi lover, with columns for Title, Author, and Year."
@@ -62,7 +68,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create the instructions
 instructions = "You will be provided with a text delimited by triple backticks. Infer its language, then generate a suitable title for it. "
@@ -79,7 +85,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create the instructions
 instructions = "You will be provided with a text delimited by triple backticks. Infer its language and the number of sentences it contains. Then, if the text has more than one sentence, generate a suitable title for it. Otherwise, if the text contains only one sentence, write 'N/A' for the title."
@@ -96,7 +102,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a one-shot prompt
 prompt = """
@@ -108,7 +114,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 response = client.chat.completions.create(
   model = "gpt-3.5-turbo",
@@ -130,7 +136,7 @@ response = client.chat.completions.create(
 print(response.choices[0].message.content)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a single-step prompt to get help planning the vacation
 prompt = "Help me plan a beach vacation."
@@ -139,7 +145,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a prompt detailing steps to plan the trip
 prompt = """
@@ -154,7 +160,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 code = '''
 def calculate_rectangle_area(length, width):
@@ -175,7 +181,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create the chain-of-thought prompt
 prompt = "Compute the age of my friend's father in 10 years, given that now he's double my friend's age, and my friend is 20. Give a step by step explanation."
@@ -184,7 +190,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Define the example 
 example = """Q: Sum the even numbers in the following set: {9, 10, 13, 4, 2}.
@@ -200,7 +206,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create the self_consistency instruction
 self_consistency_instruction = "Imagine three completely independent experts who reason differently are answering this question. The final answer is obtained by majority vote. The question is: "
@@ -215,7 +221,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Refine the following prompt
 prompt = "Generate a table that contains the top 10 pre-trained language models, with columns for language model, release year, and owners."
@@ -224,7 +230,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Refine the following prompt
 prompt = """
@@ -239,7 +245,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt to summarize the report
 prompt = f"""
@@ -252,7 +258,7 @@ response = get_response(prompt)
 print("Summarized report: \n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt to summarize the product description
 prompt = f"""
@@ -266,7 +272,7 @@ print("Original description: \n", product_description)
 print("Summarized description: \n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt to expand the product's description
 prompt = f"""
@@ -280,7 +286,7 @@ print("Original description: \n", product_description)
 print("Expanded description: \n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt that translates
 prompt = f"""Translate the English marketing message delimited by triple backticks to French, Spanish, and Japanese
@@ -293,7 +299,7 @@ print("English:", marketing_message)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt to change the email's tone
 prompt = f"""
@@ -307,7 +313,7 @@ print("Before transformation: \n", sample_email)
 print("After transformation: \n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt to transform the text
 prompt = f"""Transform the text delimited by triple backticks with the following two steps:
@@ -321,7 +327,7 @@ print("Before transformation:\n", text)
 print("After transformation:\n", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt to classify the ticket
 prompt = f"""Classify the ticket delimited by triple backticks as technical issue, billing inquiry, or product feedback. Your response should just contain the class and nothing else.
@@ -333,7 +339,7 @@ print("Ticket: ", ticket)
 print("Class: ", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a few-shot prompt to get the ticket's entities
 prompt = f"""Ticket: {ticket_1} -> Entities: {entities_1}
@@ -347,7 +353,7 @@ print("Ticket: ", ticket_4)
 print("Entities: ", response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a prompt that asks the model for the function
 prompt = "Write a Python function that accepts a list of 12 numbers representing sales for each month of the year, and outputs the month with the highest sales value"
@@ -356,7 +362,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 examples="""input = [10, 5, 8] -> output = 24
 input = [5, 2, 4] -> output = 12
@@ -372,7 +378,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 function = """def calculate_area_rectangular_floor(width, length):
      return width*length"""
@@ -387,7 +393,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft a chain-of-thought prompt that asks the model to explain what the function does
 prompt = f"""Explain what the function delimited by triple backticks does. Let's think step by step
@@ -398,7 +404,7 @@ response = get_response(prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 def get_response(system_prompt, user_prompt):
   # Assign the role and content for each message
@@ -414,7 +420,7 @@ response = get_response("You are an expert data scientist that explains complex
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Define the purpose of the chatbot
 chatbot_purpose = "You are the customer support chatbot for an e-commerce platform specializing in electronics. Your role is to assist customers with inquiries, order tracking, and troubleshooting common issues related to their purchases. "
@@ -430,7 +436,7 @@ response = get_response(base_system_prompt, "My new headphones aren't connecting
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Define the order number condition
 order_number_condition = "If the user is asking about an order, and did not specify the order number, reply by asking for this number. "
@@ -448,7 +454,7 @@ print("Response 1: ", response_1)
 print("Response 2: ", response_2)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Craft the system_prompt using the role-playing approach
 system_prompt = "Act as a learning advisor who receives queries from users mentioning their background, experience, and goals, and accordingly provides a response that recommends a tailored learning path of textbooks, including both beginner-level and more advanced options."
@@ -459,7 +465,7 @@ response = get_response(system_prompt, user_prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 base_system_prompt = "Act as a learning advisor who receives queries from users mentioning their background, experience, and goals, and accordingly provides a response that recommends a tailored learning path of textbooks, including both beginner-level and more advanced options."
 
@@ -475,7 +481,7 @@ response = get_response(system_prompt, user_prompt)
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Define the system prompt
 system_prompt = "You are a customer service chatbot for MyPersonalDelivery, a delivery service that offers a wide range of delivery options for various items. You should respond to user queries in a gentle way."
@@ -494,7 +500,7 @@ response = response.choices[0].message.content
 print(response)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Define the system prompt
 system_prompt = f"""You are a customer service chatbot for MyPersonalDelivery whose service description is delimited by triple backticks. You should respond to user queries in a gentle way.
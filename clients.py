@@ -0,0 +1,243 @@
+"""Process-wide OpenAI clients sharing pooled keep-alive connections.
+
+The course scripts create a client before every exercise; ``get_client``
+returns the same client for the same settings, so requests reuse open
+connections (HTTP/2 when the ``h2`` package is installed) instead of paying
+a new TCP and TLS handshake each time.
+
+Pool limits and timeouts can be passed in or set through the environment:
+``OPENAI_MAX_CONNECTIONS``, ``OPENAI_MAX_KEEPALIVE`` and ``OPENAI_TIMEOUT``.
+Set ``OPENAI_POOL_STATS=1`` to print connection reuse at exit and
+``OPENAI_TELEMETRY`` to record tokens, latency and cost (see ``telemetry.py``).
+
+Requests pass through ``middleware`` layers (see ``middleware.py``) before
+reaching the pool; by default those enabled through the environment.
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import os
+import sys
+import threading
+import weakref
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass
+from functools import cache, partial
+from typing import Any, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+import batch
+import budget
+import response_cache
+import scheduler
+import telemetry
+from middleware import Middleware
+
+MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", 20))
+MAX_KEEPALIVE = int(os.environ.get("OPENAI_MAX_KEEPALIVE", 10))
+TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 60))
+CONNECT_TIMEOUT = 5.0
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    opened: int = 0
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.opened
+
+    def __str__(self) -> str:
+        return (
+            f"{self.requests} requests, {self.opened} connections opened, "
+            f"{self.reused} reused"
+        )
+
+
+stats = ConnectionStats()
+_lock = threading.Lock()
+_clients: dict[tuple, OpenAI] = {}
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple, AsyncOpenAI]
+] = weakref.WeakKeyDictionary()
+
+
+def _count(name: str) -> None:
+    # Only requests that reach the network are counted, not middleware hits
+    with _lock:
+        if name == "connection.connect_tcp.complete":
+            stats.opened += 1
+        elif name.endswith(".send_request_headers.started"):
+            stats.requests += 1
+
+
+def _on_request(request: httpx.Request) -> None:
+    request.extensions["trace"] = lambda name, info: _count(name)
+
+
+async def _on_async_request(request: httpx.Request) -> None:
+    async def trace(name: str, info: dict) -> None:
+        _count(name)
+
+    request.extensions["trace"] = trace
+
+
+Layer = Callable[[httpx.BaseTransport | httpx.AsyncBaseTransport], Middleware]
+T = TypeVar("T")
+
+
+@cache
+def env_middleware() -> tuple[Layer, ...]:
+    """Middleware enabled through environment variables, outermost first."""
+    layers: list[Layer] = []
+    preflight = os.environ.get("OPENAI_PREFLIGHT")
+    if preflight:
+        truncate_input = preflight != "reject"
+        layers.append(
+            partial(budget.PreflightMiddleware, truncate_input=truncate_input)
+        )
+    if os.environ.get("OPENAI_BATCH_EXPORT"):
+        path = os.environ["OPENAI_BATCH_EXPORT"]
+        layers.append(partial(batch.ExportMiddleware, path=path))
+    if os.environ.get("OPENAI_BATCH_IMPORT"):
+        path = os.environ["OPENAI_BATCH_IMPORT"]
+        layers.append(partial(batch.ImportMiddleware, path=path))
+    responses = response_cache.from_env()
+    if responses is not None:
+        layers.append(partial(response_cache.CacheMiddleware, cache=responses))
+    if os.environ.get("OPENAI_SCHEDULER"):
+        layers.append(scheduler.SchedulerMiddleware)
+    # Innermost, so only requests that reach the API are counted and priced
+    metrics = telemetry.from_env()
+    if metrics is not None:
+        layers.append(partial(telemetry.TelemetryMiddleware, metrics=metrics))
+    return tuple(layers)
+
+
+def _transport(
+    transport_class: type[httpx.HTTPTransport] | type[httpx.AsyncHTTPTransport],
+    max_connections: int,
+    max_keepalive: int,
+    middleware: tuple[Layer, ...] | None,
+):
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_keepalive
+    )
+    http2 = importlib.util.find_spec("h2") is not None
+    transport = transport_class(limits=limits, http2=http2)
+    if middleware is None:
+        middleware = env_middleware()
+    for layer in reversed(middleware):
+        transport = layer(transport)
+    return transport
+
+
+def _resolve(api_key: str | None, base_url: str | None) -> tuple:
+    # The SDK reads these when they are not given; a client made before the
+    # environment changed must not be handed out after
+    return (
+        api_key or os.environ.get("OPENAI_API_KEY"),
+        base_url or os.environ.get("OPENAI_BASE_URL"),
+    )
+
+
+def get_client(
+    api_key: str | None = None,
+    base_url: str | None = None,
+    max_connections: int = MAX_CONNECTIONS,
+    max_keepalive: int = MAX_KEEPALIVE,
+    timeout: float = TIMEOUT,
+    middleware: tuple[Layer, ...] | None = None,
+) -> OpenAI:
+    """Shared ``OpenAI`` client for these settings."""
+    api_key, base_url = _resolve(api_key, base_url)
+    key = (api_key, base_url, max_connections, max_keepalive, timeout, middleware)
+    with _lock:
+        if key not in _clients:
+            transport = _transport(
+                httpx.HTTPTransport, max_connections, max_keepalive, middleware
+            )
+            http_client = httpx.Client(
+                transport=transport,
+                timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+                event_hooks={"request": [_on_request]},
+            )
+            _clients[key] = OpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client
+            )
+        return _clients[key]
+
+
+def get_async_client(
+    api_key: str | None = None,
+    base_url: str | None = None,
+    max_connections: int = MAX_CONNECTIONS,
+    max_keepalive: int = MAX_KEEPALIVE,
+    timeout: float = TIMEOUT,
+    middleware: tuple[Layer, ...] | None = None,
+) -> AsyncOpenAI:
+    """Shared ``AsyncOpenAI`` client for these settings and the running loop.
+
+    Async connections belong to the event loop that opened them, so each
+    loop gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    api_key, base_url = _resolve(api_key, base_url)
+    key = (api_key, base_url, max_connections, max_keepalive, timeout, middleware)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if key not in clients:
+            transport = _transport(
+                httpx.AsyncHTTPTransport, max_connections, max_keepalive, middleware
+            )
+            http_client = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+                event_hooks={"request": [_on_async_request]},
+            )
+            clients[key] = AsyncOpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client
+            )
+        return clients[key]
+
+
+async def aclose_async_clients() -> None:
+    """Close the running loop's shared ``AsyncOpenAI`` clients."""
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+
+
+def run(function: Callable[..., Coroutine[Any, Any, T]], *args, **kwargs) -> T:
+    """``asyncio.run(function(*args, **kwargs))`` for synchronous callers.
+
+    The loop's shared async clients are closed before it ends. Inside a
+    running event loop, as in Jupyter, ``asyncio.run`` cannot work, so this
+    raises a ``RuntimeError`` telling the caller to await ``function``.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError(
+            "An event loop is already running (as in Jupyter); "
+            f"use `await {function.__name__}(...)` instead"
+        )
+
+    async def main() -> T:
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            await aclose_async_clients()
+
+    return asyncio.run(main())
+
+
+if os.environ.get("OPENAI_POOL_STATS"):
+    atexit.register(lambda: print(f"OpenAI connections: {stats}", file=sys.stderr))
@@ -0,0 +1,281 @@
+"""Convert scraped HTML into ``notebook.Rmd``, ``notebook.ipynb`` and
+``script.py`` in a single pass, without pandoc, R or jupytext.
+
+``<pre><code>`` blocks become Python code cells and everything else becomes
+markdown. Blocks that are only a literal value, i.e. pasted output, become
+plain fenced markdown instead. ``script.py`` holds the code cells, with any
+that are not valid Python (damaged indentation, pasted prose output)
+commented out so that it always compiles. The result is close to, but not
+byte-for-byte the same as, what the ``jupytext`` + ``sed`` steps produced.
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 1 << 16
+
+HEADINGS = {f"h{level}": "#" * level + " " for level in range(1, 7)}
+EMPHASIS = {"strong": "**", "b": "**", "em": "*", "i": "*", "code": "`"}
+BLOCKS = {"p", "div", "section", "ul", "ol", "hr", "table", "blockquote"}
+IGNORED = {"button", "svg", "script", "style", "head"}
+
+
+@dataclass
+class Cell:
+    cell_type: str  # "markdown" or "code"
+    source: str
+
+
+def code_cell(source: str) -> Cell:
+    """A code cell, or a fenced markdown cell if ``source`` is pasted output."""
+    try:
+        ast.literal_eval(source.strip())
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return Cell("code", source)
+    return Cell("markdown", f"```\n{source}\n```")
+
+
+def _compiles(source: str) -> bool:
+    try:
+        compile(source, "<cell>", "exec")
+    except (SyntaxError, ValueError):
+        return False
+    return True
+
+
+class _NotebookParser(HTMLParser):
+    """Streaming HTML → cells; feed it any number of chunks."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cells: list[Cell] = []
+        self._markdown: list[str] = []
+        self._code: list[str] | None = None
+        self._pre: list[str] = []
+        self._code_depth = 0
+        self._ignored = 0
+        self._lists: list[int | None] = []
+        self._links: list[str] = []
+
+    def _block(self) -> None:
+        if self._markdown and not self._markdown[-1].endswith("\n\n"):
+            self._markdown.append("\n\n")
+
+    def _flush(self) -> None:
+        text = re.sub(r"[ \t]*\n[ \t]*", "\n", "".join(self._markdown))
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        if text:
+            self.cells.append(Cell("markdown", text))
+        self._markdown = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in IGNORED:
+            self._ignored += 1
+        elif self._ignored:
+            return
+        elif self._code is not None:
+            if tag == "code":
+                self._code_depth += 1
+        elif tag == "pre":
+            self._code, self._pre = [], []
+        elif tag in HEADINGS:
+            self._block()
+            self._markdown.append(HEADINGS[tag])
+        elif tag in BLOCKS:
+            self._block()
+            if tag in ("ul", "ol"):
+                self._lists.append(None if tag == "ul" else 0)
+        elif tag == "li":
+            kind = self._lists[-1] if self._lists else None
+            if kind is None:
+                bullet = "- "
+            else:
+                self._lists[-1] = kind + 1
+                bullet = f"{kind + 1}. "
+            indent = "  " * max(len(self._lists) - 1, 0)
+            self._markdown.append("\n" + indent + bullet)
+        elif tag == "br":
+            self._markdown.append("  \n")
+        elif tag in EMPHASIS:
+            self._markdown.append(EMPHASIS[tag])
+        elif tag == "a":
+            self._links.append(attrs.get("href") or "")
+            self._markdown.append("[")
+        elif tag == "img":
+            self._markdown.append(f"![{attrs.get('alt') or ''}]({attrs.get('src')})")
+
+    def handle_endtag(self, tag):
+        if tag in IGNORED:
+            self._ignored = max(self._ignored - 1, 0)
+        elif self._ignored:
+            return
+        elif tag == "pre" and self._code is not None:
+            self._end_code()
+        elif self._code is not None:
+            if tag == "code":
+                self._code_depth = max(self._code_depth - 1, 0)
+        elif tag in HEADINGS or tag in BLOCKS or tag == "li":
+            if tag in ("ul", "ol") and self._lists:
+                self._lists.pop()
+            if tag != "li":
+                self._block()
+        elif tag in EMPHASIS:
+            self._markdown.append(EMPHASIS[tag])
+        elif tag == "a" and self._links:
+            self._markdown.append(f"]({self._links.pop()})")
+
+    def _end_code(self) -> None:
+        # Only the <code> text counts; pages add copy buttons and footers
+        code = "".join(self._code or self._pre).strip("\n")
+        self._code = None
+        self._flush()
+        self.cells.append(code_cell(code))
+
+    def handle_data(self, data):
+        if self._ignored:
+            return
+        if self._code is not None:
+            self._pre.append(data)
+            if self._code_depth:
+                self._code.append(data)
+        else:
+            self._markdown.append(re.sub(r"\s+", " ", data))
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def read_html(path: str) -> list[Cell]:
+    """Parse an HTML file into cells, reading it in chunks."""
+    parser = _NotebookParser()
+    with open(path, encoding="utf-8") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), ""):
+            parser.feed(chunk)
+    parser.close()
+    return parser.cells
+
+
+def read_rmd(path: str) -> list[Cell]:
+    """Parse an R Markdown file whose chunks are ```` ```{python} ````."""
+    cells: list[Cell] = []
+    lines: list[str] = []
+    in_code = False
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not in_code and line.startswith("```{python"):
+                text = "".join(lines).strip("\n")
+                if text:
+                    cells.append(Cell("markdown", text))
+                lines, in_code = [], True
+            elif in_code and line.rstrip() == "```":
+                cells.append(code_cell("".join(lines).strip("\n")))
+                lines, in_code = [], False
+            else:
+                lines.append(line)
+    text = "".join(lines).strip("\n")
+    if text:
+        cells.append(code_cell(text) if in_code else Cell("markdown", text))
+    return cells
+
+
+def rmd(cells: Iterable[Cell]) -> str:
+    parts = [
+        (
+            f"```{{python}}\n{cell.source}\n```"
+            if cell.cell_type == "code"
+            else cell.source
+        )
+        for cell in cells
+    ]
+    return "\n\n".join(parts) + "\n"
+
+
+def ipynb(cells: Iterable[Cell]) -> str:
+    notebook_cells = []
+    for cell in cells:
+        source = cell.source.splitlines(keepends=True)
+        if cell.cell_type == "code":
+            notebook_cells.append(
+                {
+                    "cell_type": "code",
+                    "execution_count": None,
+                    "metadata": {},
+                    "outputs": [],
+                    "source": source,
+                }
+            )
+        else:
+            notebook_cells.append(
+                {"cell_type": "markdown", "metadata": {}, "source": source}
+            )
+    notebook = {
+        "cells": notebook_cells,
+        "metadata": {
+            "kernelspec": {
+                "display_name": "Python 3",
+                "language": "python",
+                "name": "python3",
+            },
+            "language_info": {"name": "python"},
+        },
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    return json.dumps(notebook, indent=4, ensure_ascii=False) + "\n"
+
+
+def script(cells: Iterable[Cell]) -> str:
+    sources = []
+    for cell in cells:
+        if cell.cell_type != "code":
+            continue
+        if _compiles(cell.source):
+            sources.append(cell.source)
+        else:
+            lines = [f"# {line}".rstrip() for line in cell.source.splitlines()]
+            sources.append(
+                "# Not valid Python in the source page:\n" + "\n".join(lines)
+            )
+    return "\n\n".join(sources) + "\n"
+
+
+def write(cells: list[Cell], directory: str, with_rmd: bool = True) -> None:
+    """Write ``notebook.Rmd`` (optional), ``notebook.ipynb`` and ``script.py``."""
+    outputs = {"notebook.ipynb": ipynb(cells), "script.py": script(cells)}
+    if with_rmd:
+        outputs["notebook.Rmd"] = rmd(cells)
+    for name, text in outputs.items():
+        path = os.path.join(directory, name)
+        try:
+            with open(path, encoding="utf-8") as file:
+                if file.read() == text:
+                    continue
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="scrape.html, tutorial.html or notebook.Rmd")
+    parser.add_argument("-d", "--directory", help="default: next to source")
+    args = parser.parse_args()
+
+    directory = args.directory or os.path.dirname(args.source) or "."
+    if args.source.endswith(".Rmd"):
+        write(read_rmd(args.source), directory, with_rmd=False)
+    else:
+        write(read_html(args.source), directory)
+
+
+if __name__ == "__main__":
+    main()
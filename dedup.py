@@ -0,0 +1,120 @@
+"""Group near-duplicate review texts so the model sees each one only once.
+
+``NearDuplicates`` compares MinHash signatures of word shingles through
+locality-sensitive hashing: every text either joins the cluster of an earlier
+representative whose estimated Jaccard similarity reaches ``threshold`` or
+becomes a representative itself. Texts are processed one at a time and only
+the representatives' signatures are kept, so memory grows linearly with the
+number of distinct texts and CSVs can be streamed.
+"""
+
+import argparse
+import hashlib
+import re
+from collections.abc import Hashable
+
+import numpy as np
+
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def shingles(text: str) -> set[str]:
+    """Lower-cased words and word pairs of ``text``."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+class NearDuplicates:
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self._rows = num_perm // bands
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+        self._buckets: list[dict[bytes, Hashable]] = [{} for _ in range(bands)]
+        self._signatures: dict[Hashable, np.ndarray] = {}
+        self.texts = 0
+
+    @property
+    def representatives(self) -> int:
+        return len(self._signatures)
+
+    @property
+    def reviews_skipped(self) -> int:
+        """Texts that joined an earlier cluster and need not be sent."""
+        return self.texts - self.representatives
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(s.encode(), digest_size=4).digest(), "little"
+                )
+                for s in shingles(text)
+            ),
+            dtype=np.uint64,
+        )
+        if not len(hashes):
+            hashes = np.zeros(1, dtype=np.uint64)
+        # Universal hashing; uint64 wrap-around is fine for MinHash
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0)
+
+    def add(self, key: Hashable, text: str) -> Hashable:
+        """Key of the representative for ``text``: an earlier key or ``key``."""
+        self.texts += 1
+        signature = self.signature(text)
+        bands = [
+            signature[i * self._rows : (i + 1) * self._rows].tobytes()
+            for i in range(self.bands)
+        ]
+        checked = set()
+        for buckets, band in zip(self._buckets, bands):
+            candidate = buckets.get(band)
+            if candidate is None or candidate in checked:
+                continue
+            checked.add(candidate)
+            similarity = np.mean(self._signatures[candidate] == signature)
+            if similarity >= self.threshold:
+                return candidate
+        self._signatures[key] = signature
+        for buckets, band in zip(self._buckets, bands):
+            buckets.setdefault(band, key)
+        return key
+
+
+def main() -> None:
+    from reviews import read_reviews
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="reviews CSV")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--show", type=int, default=5, help="clusters to print")
+    args = parser.parse_args()
+
+    duplicates = NearDuplicates(args.threshold)
+    texts: dict[int, str] = {}
+    clusters: dict[int, list[int]] = {}
+    for review_id, text in read_reviews(args.source):
+        if not text:
+            continue
+        representative = duplicates.add(review_id, text)
+        if representative == review_id:
+            texts[review_id] = text
+        else:
+            clusters.setdefault(representative, []).append(review_id)
+    print(
+        f"{duplicates.texts} reviews, {duplicates.representatives} representatives, "
+        f"{duplicates.reviews_skipped} reviews skipped"
+    )
+    largest = sorted(clusters.items(), key=lambda item: -len(item[1]))
+    for representative, members in largest[: args.show]:
+        print(f"{representative} (+{len(members)}): {texts[representative][:80]}")
+
+
+if __name__ == "__main__":
+    main()
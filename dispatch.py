@@ -0,0 +1,119 @@
+"""Concurrent function-calling dispatcher for the function-calling tutorial.
+
+Instead of rebuilding ``available_functions`` for every sample and calling
+``fuction_to_call(*list(function_args.values()))``, build the registry once
+and let it bind arguments by name::
+
+    registry = FunctionRegistry(
+        custom_functions,
+        {
+            "extract_student_info": extract_student_info,
+            "extract_school_info": extract_school_info,
+        },
+    )
+    for i, result in enumerate(dispatch(descriptions, registry)):
+        print(f"\\nSample#{i+1}\\n")
+        print(result)
+
+Samples are sent concurrently and the local handlers run in a thread pool.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from openai import AsyncOpenAI
+
+import clients
+from chat import MODEL
+from clients import get_async_client
+from schemas import ArgumentError, compile_functions, repair_request
+
+
+class FunctionRegistry:
+    """Handlers for the function schemas sent in ``functions``."""
+
+    def __init__(self, functions: list[dict], handlers: dict[str, Callable]):
+        self.functions = functions
+        self.schemas = {function["name"]: function for function in functions}
+        self.handlers = handlers
+        for function in functions:
+            if function["name"] not in handlers:
+                raise KeyError(f"No handler for {function['name']}")
+        self.records = compile_functions(functions)
+
+    def bind(self, name: str, arguments: str | dict) -> dict:
+        """Validate ``arguments`` against the schema of ``name``, by name."""
+        if name not in self.records:
+            raise ArgumentError(f"Unknown function {name}")
+        return self.records[name].decode(arguments).as_kwargs()
+
+    def call(self, name: str, arguments: str | dict):
+        return self.handlers[name](**self.bind(name, arguments))
+
+
+async def adispatch(
+    samples: list[str],
+    registry: FunctionRegistry,
+    model: str = MODEL,
+    concurrency: int = 8,
+    workers: int | None = None,
+    client: AsyncOpenAI | None = None,
+    return_exceptions: bool = False,
+    repair: bool = True,
+) -> list:
+    """Handler result (or the reply text) for each sample, in input order.
+
+    Arguments that do not fit their schema are sent back to the model once
+    for correction (unless ``repair`` is false); if the corrected call does
+    not fit either, its ``ArgumentError`` is raised (or returned).
+    """
+    client = client or get_async_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        async def corrected(name: str, arguments: str, error: ArgumentError) -> dict:
+            request = repair_request(registry.schemas[name], arguments, str(error))
+            async with semaphore:
+                response = await client.chat.completions.create(model=model, **request)
+            call = response.choices[0].message.function_call
+            if call is None:
+                raise ArgumentError(f"{name}: the reply has no function call")
+            return registry.bind(name, call.arguments)
+
+        async def run(sample: str):
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": sample}],
+                    functions=registry.functions,
+                    function_call="auto",
+                )
+            message = response.choices[0].message
+            if not message.function_call:
+                return message.content
+            call = message.function_call
+            try:
+                kwargs = registry.bind(call.name, call.arguments)
+            except ArgumentError as error:
+                if not repair or call.name not in registry.schemas:
+                    raise
+                kwargs = await corrected(call.name, call.arguments, error)
+            handler = registry.handlers[call.name]
+            return await loop.run_in_executor(pool, partial(handler, **kwargs))
+
+        return await asyncio.gather(
+            *(run(sample) for sample in samples), return_exceptions=return_exceptions
+        )
+
+
+def dispatch(samples: list[str], registry: FunctionRegistry, **kwargs) -> list:
+    """Synchronous ``adispatch``; takes the same keyword arguments.
+
+    Await ``adispatch`` instead where an event loop is already running, as in
+    Jupyter.
+    """
+    return clients.run(adispatch, samples, registry, **kwargs)
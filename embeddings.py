@@ -0,0 +1,254 @@
+"""Embedding index and semantic search over the review texts.
+
+Vectors are computed in batches and appended to a float32 matrix on disk,
+keyed by ``Review ID``; searches memory-map it and score every row with one
+matrix product. Adding rows only embeds the IDs that are not stored yet.
+``HashEmbedder`` is a deterministic local embedder for offline use and tests;
+``OpenAIEmbedder`` calls the embeddings endpoint. Once the corpus grows,
+``build_ivf`` clusters the vectors so that queries only scan the closest
+clusters.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections.abc import Iterable, Iterator
+from typing import Protocol
+
+import numpy as np
+from openai import OpenAI
+
+from clients import get_client
+from reviews import read_reviews
+
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+
+    def __call__(self, texts: list[str]) -> np.ndarray: ...
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashEmbedder:
+    """Signed feature hashing of words and word pairs; no network needed."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def _features(self, text: str) -> Iterator[str]:
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        yield from words
+        yield from (f"{a} {b}" for a, b in zip(words, words[1:]))
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value >> 63 else -1.0
+                vectors[row, value % self.dim] += sign
+        return normalize(vectors)
+
+
+class OpenAIEmbedder:
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        dim: int = 1536,
+        client: OpenAI | None = None,
+    ):
+        self.model = model
+        self.dim = dim
+        self.name = f"{model}-{dim}"
+        self.client = client
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        response = (self.client or get_client()).embeddings.create(
+            model=self.model, input=texts, dimensions=self.dim
+        )
+        data = sorted(response.data, key=lambda item: item.index)
+        return normalize(np.array([item.embedding for item in data], np.float32))
+
+
+class EmbeddingIndex:
+    """Float32 vectors in ``directory``, one row per review ID."""
+
+    def __init__(self, directory: str, embedder: Embedder):
+        self.directory = directory
+        self.embedder = embedder
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._ids_path = os.path.join(directory, "ids.i64")
+        meta_path = os.path.join(directory, "meta.json")
+        meta = {"embedder": embedder.name, "dim": embedder.dim}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as file:
+                stored = json.load(file)
+            if stored != meta:
+                raise ValueError(f"{directory} holds {stored['embedder']} vectors")
+        else:
+            with open(meta_path, "w", encoding="utf-8") as file:
+                json.dump(meta, file)
+        self._ivf_path = os.path.join(directory, "ivf.npz")
+        self._load()
+
+    def _load(self) -> None:
+        self.ids = (
+            np.fromfile(self._ids_path, dtype=np.int64)
+            if os.path.exists(self._ids_path)
+            else np.empty(0, dtype=np.int64)
+        )
+        self._known = set(self.ids.tolist())
+        self._ivf = (
+            dict(np.load(self._ivf_path)) if os.path.exists(self._ivf_path) else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if not len(self):
+            return np.empty((0, self.embedder.dim), dtype=np.float32)
+        return np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(len(self), self.embedder.dim),
+        )
+
+    def add(self, rows: Iterable[tuple[int, str]], batch_size: int = 256) -> int:
+        """Embed and append the rows whose ID is new; return how many."""
+        added = 0
+        batch: list[tuple[int, str]] = []
+        for review_id, text in rows:
+            if review_id in self._known or not text:
+                continue
+            self._known.add(review_id)
+            batch.append((review_id, text))
+            if len(batch) == batch_size:
+                added += self._append(batch)
+                batch = []
+        if batch:
+            added += self._append(batch)
+        self._load()
+        return added
+
+    def _append(self, batch: list[tuple[int, str]]) -> int:
+        vectors = self.embedder([text for _, text in batch]).astype(np.float32)
+        stored = (
+            os.path.getsize(self._ids_path) // 8
+            if os.path.exists(self._ids_path)
+            else 0
+        )
+        # Vectors first: a crash in between leaves extra rows that ids ignore
+        with open(self._vectors_path, "ab") as file:
+            file.truncate(stored * self.embedder.dim * 4)
+            vectors.tofile(file)
+        with open(self._ids_path, "ab") as file:
+            np.array([i for i, _ in batch], dtype=np.int64).tofile(file)
+        return len(batch)
+
+    def build_ivf(self, clusters: int | None = None, iterations: int = 10) -> None:
+        """Cluster the stored vectors with k-means for ``search(nprobe=...)``."""
+        vectors = np.asarray(self.vectors)
+        clusters = min(clusters or int(np.sqrt(len(vectors))), len(vectors)) or 1
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(len(vectors), clusters, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for cluster in range(clusters):
+                members = vectors[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = normalize(centroids)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        np.savez(self._ivf_path, centroids=centroids, assignment=assignment)
+        self._ivf = {"centroids": centroids, "assignment": assignment}
+
+    def search(
+        self, query: str, k: int = 10, nprobe: int | None = None, chunk: int = 65536
+    ) -> list[tuple[int, float]]:
+        """The ``k`` most similar review IDs with their cosine similarity.
+
+        With an IVF index and ``nprobe``, only rows in the ``nprobe`` closest
+        clusters, plus rows added after the index was built, are scored.
+        """
+        q = self.embedder([query])[0]
+        vectors = self.vectors
+        rows = None
+        if self._ivf is not None and nprobe:
+            closest = np.argsort(self._ivf["centroids"] @ q)[::-1][:nprobe]
+            assignment = self._ivf["assignment"]
+            rows = np.concatenate(
+                [
+                    np.flatnonzero(np.isin(assignment, closest)),
+                    np.arange(len(assignment), len(vectors)),
+                ]
+            )
+        candidates = np.arange(len(vectors)) if rows is None else rows
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        # Score in chunks so huge matrices never load into memory at once
+        for start in range(0, len(candidates), chunk):
+            part = candidates[start : start + chunk]
+            scores = (
+                vectors[part[0] : part[-1] + 1] @ q
+                if rows is None
+                else vectors[part] @ q
+            )
+            best_rows = np.concatenate([best_rows, part])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+        order = np.argsort(best_scores)[::-1]
+        return [
+            (int(self.ids[r]), float(best_scores[i]))
+            for i, r in zip(order, best_rows[order])
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-d", "--directory", default=".embeddings")
+    parser.add_argument(
+        "--openai", action="store_true", help="use the OpenAI embeddings endpoint"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_add = commands.add_parser("add", help=EmbeddingIndex.add.__doc__)
+    parser_add.add_argument("source", help="reviews CSV")
+    parser_add.add_argument("--ivf", action="store_true", help="rebuild the IVF index")
+    parser_search = commands.add_parser("search", help="search by meaning")
+    parser_search.add_argument("query")
+    parser_search.add_argument("-k", type=int, default=5)
+    parser_search.add_argument("--nprobe", type=int)
+    parser_search.add_argument("--source", help="reviews CSV, to print the texts")
+    args = parser.parse_args()
+
+    index = EmbeddingIndex(
+        args.directory, OpenAIEmbedder() if args.openai else HashEmbedder()
+    )
+    if args.command == "add":
+        added = index.add(read_reviews(args.source))
+        if args.ivf:
+            index.build_ivf()
+        print(f"Added {added} reviews; {len(index)} in {args.directory}")
+        return
+    results = index.search(args.query, args.k, args.nprobe)
+    texts = dict(read_reviews(args.source)) if args.source else {}
+    for review_id, score in results:
+        print(f"{review_id:>8} {score:6.3f} {texts.get(review_id, '')[:100]}")
+
+
+if __name__ == "__main__":
+    main()
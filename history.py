@@ -0,0 +1,122 @@
+"""Token-budgeted conversation history for multi-turn chats.
+
+Replaces the ever-growing ``messages`` list of the tutor loop::
+
+    conversation = Conversation("You are a helpful math tutor.", budget=1000)
+    for q in user_msgs:
+        conversation.append("user", q)
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo", messages=conversation.messages, max_tokens=100
+        )
+        conversation.append("assistant", response.choices[0].message.content)
+
+The system prompt is always kept. Once the history exceeds ``budget`` tokens
+the oldest turns are dropped, or folded into a rolling summary when a
+``summarize`` callable is given. Each message is counted once, when added.
+"""
+
+from collections import deque
+from collections.abc import Callable
+
+from openai import OpenAI
+
+from chat import MODEL, estimate_tokens
+from clients import get_client
+
+Message = dict[str, str]
+
+
+def _count(message: Message) -> int:
+    return estimate_tokens([message])
+
+
+class Conversation:
+    def __init__(
+        self,
+        system: str | None = None,
+        budget: int = 3000,
+        summarize: Callable[[str | None, list[Message]], str] | None = None,
+        count_tokens: Callable[[Message], int] = _count,
+    ):
+        self.budget = budget
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+        self.system = {"role": "system", "content": system} if system else None
+        self.summary: str | None = None
+        self._turns: deque[tuple[Message, int]] = deque()
+        self._fixed = self.count_tokens(self.system) if self.system else 0
+        self._summary_tokens = 0
+        self._total = 0
+
+    @property
+    def tokens(self) -> int:
+        """Estimated prompt tokens of ``messages``."""
+        return self._fixed + self._summary_tokens + self._total
+
+    @property
+    def messages(self) -> list[Message]:
+        messages = [self.system] if self.system else []
+        if self.summary:
+            messages.append(self._summary_message())
+        messages.extend(message for message, _ in self._turns)
+        return messages
+
+    def _summary_message(self) -> Message:
+        content = f"Summary of the earlier conversation: {self.summary}"
+        return {"role": "system", "content": content}
+
+    def append(self, role: str, content: str) -> None:
+        message = {"role": role, "content": content}
+        tokens = self.count_tokens(message)
+        self._turns.append((message, tokens))
+        self._total += tokens
+        self._trim()
+
+    def _drop(self) -> list[Message]:
+        dropped: list[Message] = []
+        # Always keep the latest message, even if it alone exceeds the budget
+        while self.tokens > self.budget and len(self._turns) > 1:
+            message, tokens = self._turns.popleft()
+            self._total -= tokens
+            dropped.append(message)
+            # Drop whole exchanges so the history never starts with a reply,
+            # unless that reply is the latest message
+            if len(self._turns) > 1 and self._turns[0][0]["role"] == "assistant":
+                message, tokens = self._turns.popleft()
+                self._total -= tokens
+                dropped.append(message)
+        return dropped
+
+    def _trim(self) -> None:
+        while dropped := self._drop():
+            if not self.summarize:
+                return
+            self.summary = self.summarize(self.summary, dropped)
+            self._summary_tokens = self.count_tokens(self._summary_message())
+            # A longer summary can push the history back over the budget
+            if self.tokens <= self.budget:
+                return
+
+
+def model_summarizer(
+    client: OpenAI | None = None, model: str = MODEL, max_tokens: int = 150
+) -> Callable[[str | None, list[Message]], str]:
+    """``summarize`` callable that asks the model to update the summary."""
+
+    def summarize(summary: str | None, messages: list[Message]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = (
+            "Update the summary of a conversation with the new messages. "
+            "Keep it under 100 words.\n"
+            f"Summary so far: {summary or '(none)'}\n"
+            f"New messages:\n{transcript}"
+        )
+        response = (client or get_client()).chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0,
+        )
+        return response.choices[0].message.content
+
+    return summarize
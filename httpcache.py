@@ -0,0 +1,111 @@
+"""Persistent, content-addressed cache for scraped pages.
+
+Responses are indexed by URL and their bodies are stored once per SHA-256
+digest, so identical pages share storage. Each entry keeps the validators
+(``ETag``/``Last-Modified``) needed to revalidate it with a conditional GET.
+Values derived from a body (e.g. the parsed exercise HTML) can be stored next
+to it, keyed by the body and a version of the code that derived them, so that
+unchanged pages are never parsed twice by the same code.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+
+CACHE_DIR = ".scrape-cache"
+
+
+@dataclass
+class Entry:
+    url: str
+    digest: str
+    headers: dict[str, str]
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class HTTPCache:
+    """On-disk cache; safe to share between threads and processes."""
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.directory, kind, digest[:2], digest)
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp, path)
+
+    def _read(self, path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, url: str) -> Entry | None:
+        data = self._read(self._path("index", _sha256(url.encode())))
+        if data is None:
+            return None
+        entry = Entry(**json.loads(data))
+        if not os.path.exists(self._path("objects", entry.digest)):
+            return None
+        return entry
+
+    def body(self, entry: Entry) -> bytes:
+        data = self._read(self._path("objects", entry.digest))
+        if data is None:
+            raise KeyError(entry.url)
+        return data
+
+    def store(self, url: str, headers: dict[str, str], body: bytes) -> Entry:
+        digest = _sha256(body)
+        path = self._path("objects", digest)
+        if not os.path.exists(path):
+            self._write(path, body)
+        entry = Entry(
+            url=url,
+            digest=digest,
+            headers={k: v for k, v in headers.items() if k == "content-type"},
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+        )
+        index = self._path("index", _sha256(url.encode()))
+        self._write(index, json.dumps(asdict(entry)).encode())
+        return entry
+
+    def derived(self, name: str, body: bytes, version: bytes = b"") -> str | None:
+        """Return the value called ``name`` previously derived from ``body``.
+
+        ``version`` identifies the code that derived it (e.g. a hash of the
+        parser), so values derived by older code are not served. Raises
+        ``KeyError`` if nothing has been stored for this body and version yet.
+        """
+        data = self._read(self._path(name, _sha256(version + body)))
+        if data is None:
+            raise KeyError(name)
+        return json.loads(data)
+
+    def store_derived(
+        self, name: str, body: bytes, value: str | None, version: bytes = b""
+    ) -> None:
+        path = self._path(name, _sha256(version + body))
+        self._write(path, json.dumps(value).encode())
@@ -0,0 +1,58 @@
+"""Base class for httpx transports that wrap the OpenAI clients' requests.
+
+Every ``client.*.create`` call goes through the client's transport, so a
+``Middleware`` sees all of them regardless of which script or helper made
+the call. ``clients.get_client`` stacks them around the pooled transport.
+"""
+
+import json
+
+import httpx
+
+
+class Middleware(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Passes requests through to ``inner``; override to intercept them."""
+
+    def __init__(self, inner: httpx.BaseTransport | httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.inner.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.inner.handle_async_request(request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def endpoint(request: httpx.Request) -> str:
+    """API path without the ``/v1`` prefix, e.g. ``/chat/completions``."""
+    path = request.url.path
+    return path[path.find("/v1") + 3 :] if "/v1/" in path else path
+
+
+def request_json(request: httpx.Request) -> dict | None:
+    """JSON body of ``request``, or None for multipart and bodiless requests."""
+    if not request.headers.get("content-type", "").startswith("application/json"):
+        return None
+    return json.loads(request.read() or b"null")
+
+
+def form_field(request: httpx.Request, name: str) -> str | None:
+    """Value of the multipart form field ``name``, without reading the body."""
+    # httpx keeps the fields of a multipart upload until it streams them
+    for field in getattr(request.stream, "fields", ()):
+        value = getattr(field, "value", None)
+        if getattr(field, "name", None) == name and value is not None:
+            return value.decode() if isinstance(value, bytes) else str(value)
+    return None
+
+
+def json_response(
+    request: httpx.Request, payload: dict, status: int = 200, **headers: str
+) -> httpx.Response:
+    return httpx.Response(status, json=payload, headers=headers, request=request)
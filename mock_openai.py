@@ -0,0 +1,530 @@
+"""Local stand-in for the OpenAI API, for tests and benchmarks.
+
+Replies are deterministic: the completions endpoint fills ``--reply`` (by
+default ``"Echo: {prompt}"``) with the prompt, the chat endpoint with the
+last user message, unless a ``--replies`` JSON file maps a substring of it to
+a canned reply. Chat requests with ``functions`` get a ``function_call``
+whose arguments follow the schema, numbers taken from the message in order.
+The audio endpoints describe the uploaded file and the moderation endpoint
+scores keywords. Like the provider's prompt cache, chat and completions
+usage reports as ``cached_tokens`` the part of the prompt (from 1024 tokens,
+in 128-token steps) that starts an earlier prompt byte for byte.
+
+Latency is ``--latency`` seconds on average, drawn from ``--distribution``
+with ``--seed``; ``--error-rate`` and ``--429-rate`` fail that fraction of
+requests. Streamed replies send ``--chunk-words`` words per chunk,
+``--chunk-delay`` seconds apart. With ``--rpm``/``--tpm`` each model gets
+request and token budgets per ``--window`` seconds: responses carry
+``x-ratelimit-*`` headers and requests over budget get a 429 with
+``retry-after``. Point any script at it with ``OPENAI_BASE_URL``:
+
+``` sh
+python mock_openai.py --port 8000 --latency 0.2 --distribution lognormal
+OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock python script.py
+```
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import wave
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TEMPLATE = "Echo: {prompt}"
+DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def reply(prompt: str, template: str = TEMPLATE, canned: dict | None = None) -> str:
+    """The first canned reply whose key is in ``prompt``, else the template."""
+    for key, text in (canned or {}).items():
+        if key in prompt:
+            return text
+    return template.format(prompt=prompt)
+
+
+def delay(mean: float, distribution: str, rng: random.Random) -> float:
+    """Seconds of latency drawn from ``distribution`` with the given mean."""
+    if mean <= 0 or distribution == "constant":
+        return max(mean, 0.0)
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    # Long right tail; sigma 1 puts p99 near 6x the median
+    sigma = 1.0
+    return rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+
+
+def _argument(key: str, schema: dict, numbers: list[str]):
+    kind = schema.get("type")
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind in ("integer", "number"):
+        value = float(numbers.pop(0)) if numbers else 0.0
+        return int(value) if kind == "integer" and value.is_integer() else value
+    if kind == "boolean":
+        return False
+    if kind == "array":
+        return [_argument(key, schema.get("items", {}), numbers)]
+    if kind == "object":
+        return {}
+    return f"mock {key}"
+
+
+def function_call(body: dict, text: str) -> dict | None:
+    """A call to the requested function, or to the one best matching ``text``."""
+    functions = body.get("functions") or []
+    choice = body.get("function_call", "auto")
+    if not functions or choice == "none":
+        return None
+    if isinstance(choice, dict):
+        function = next(f for f in functions if f["name"] == choice["name"])
+    else:
+        words = set(text.lower().split())
+        function = max(
+            functions,
+            key=lambda f: len(words & set(f.get("description", "").lower().split())),
+        )
+    numbers = _NUMBER.findall(text)
+    properties = function.get("parameters", {}).get("properties", {})
+    arguments = {
+        key: _argument(key, schema, numbers) for key, schema in properties.items()
+    }
+    return {"name": function["name"], "arguments": json.dumps(arguments)}
+
+
+def chat_completion(
+    body: dict, template: str = TEMPLATE, canned: dict | None = None
+) -> dict:
+    messages = body.get("messages", [])
+    prompt = " ".join(str(m.get("content") or "") for m in messages)
+    last = next(
+        (m.get("content") or "" for m in reversed(messages) if m["role"] == "user"),
+        "",
+    )
+    call = function_call(body, last)
+    if call:
+        message = {"role": "assistant", "content": None, "function_call": call}
+        content = call["arguments"]
+    else:
+        content = reply(last, template, canned)
+        message = {"role": "assistant", "content": content}
+    prompt_tokens, completion_tokens = _tokens(prompt), _tokens(content)
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-3.5-turbo"),
+        "choices": [
+            {
+                "index": 0,
+                "message": message,
+                "finish_reason": "function_call" if call else "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def completion(
+    body: dict, template: str = TEMPLATE, canned: dict | None = None
+) -> dict:
+    prompt = str(body.get("prompt", ""))
+    text = reply(prompt, template, canned)
+    prompt_tokens, completion_tokens = _tokens(prompt), _tokens(text)
+    return {
+        "id": "cmpl-mock",
+        "object": "text_completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-3.5-turbo-instruct"),
+        "choices": [
+            {"index": 0, "text": text, "logprobs": None, "finish_reason": "stop"}
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def chat_chunks(
+    body: dict,
+    words_per_chunk: int = 1,
+    template: str = TEMPLATE,
+    canned: dict | None = None,
+) -> list[dict]:
+    """``chat_completion`` split into streaming chunks of ``words_per_chunk``."""
+    reply = chat_completion(body, template, canned)
+    message = reply["choices"][0]["message"]
+    chunk = {k: reply[k] for k in ("id", "created", "model")}
+    chunk["object"] = "chat.completion.chunk"
+    deltas = [{"role": "assistant", "content": ""}]
+    call = message.get("function_call")
+    if call:
+        deltas[0]["function_call"] = {"name": call["name"], "arguments": ""}
+    words = (call["arguments"] if call else message["content"]).split(" ")
+    for i in range(0, len(words), words_per_chunk):
+        text = " ".join(words[i : i + words_per_chunk])
+        text = text if i == 0 else " " + text
+        deltas.append(
+            {"function_call": {"arguments": text}} if call else {"content": text}
+        )
+    chunks = [
+        {**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        for delta in deltas
+    ]
+    finish = reply["choices"][0]["finish_reason"]
+    chunks.append(
+        {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": finish}]}
+    )
+    if body.get("stream_options", {}).get("include_usage"):
+        chunks.append({**chunk, "choices": [], "usage": reply["usage"]})
+    return chunks
+
+
+# Insults like "ugly" are missing from moderation.RISKY on purpose, so that
+# benchmarks see what its local pre-filter lets through
+MODERATION_KEYWORDS = {
+    "harassment": ("idiot", "stupid", "ugly", "worthless", "pathetic"),
+    "harassment/threatening": ("i will hurt you",),
+    "hate": ("hate",),
+    "hate/threatening": (),
+    "illicit": ("drugs",),
+    "illicit/violent": (),
+    "self-harm": ("hurt myself",),
+    "self-harm/instructions": (),
+    "self-harm/intent": ("hurt myself",),
+    "sexual": ("sex",),
+    "sexual/minors": (),
+    "violence": ("kill", "murder"),
+    "violence/graphic": ("blood",),
+}
+
+
+def moderation(body: dict) -> dict:
+    """High scores for the categories whose keywords appear in each input."""
+    inputs = body.get("input", "")
+    results = []
+    for text in [inputs] if isinstance(inputs, str) else inputs:
+        text = text.lower()
+        scores = {
+            category: 0.9 if any(word in text for word in words) else 0.001
+            for category, words in MODERATION_KEYWORDS.items()
+        }
+        categories = {category: score > 0.5 for category, score in scores.items()}
+        results.append(
+            {
+                "flagged": any(categories.values()),
+                "categories": categories,
+                "category_scores": scores,
+            }
+        )
+    model = body.get("model", "omni-moderation-latest")
+    return {"id": "modr-mock", "model": model, "results": results}
+
+
+def transcription(fields: dict) -> dict:
+    """Names the uploaded file and, for WAV audio, its duration."""
+    name, data = fields.get("file", ("audio", b""))
+    try:
+        with wave.open(io.BytesIO(data)) as audio:
+            duration = f"{audio.getnframes() / audio.getframerate():.1f}s"
+    except (wave.Error, EOFError):
+        duration = f"{len(data)} bytes"
+    return {"text": f"Transcript of {name} ({duration})."}
+
+
+def multipart(content_type: str, data: bytes) -> dict:
+    """Form fields of a multipart body; files map to ``(filename, bytes)``."""
+    header = f"Content-Type: {content_type}\r\n\r\n".encode()
+    message = BytesParser().parsebytes(header + data)
+    fields = {}
+    for part in message.get_payload():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True)
+        filename = part.get_filename()
+        fields[name] = (filename, payload) if filename else payload.decode()
+    return fields
+
+
+class RateLimit:
+    """Per-model request and token buckets that refill over ``window`` seconds."""
+
+    def __init__(
+        self, rpm: int | None = None, tpm: int | None = None, window: float = 60.0
+    ):
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.window = window
+        self._buckets: dict[tuple[str, str], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, model: str, tokens: int) -> tuple[bool, dict[str, str]]:
+        """Whether the request is allowed, and the headers to send with it."""
+        now = time.monotonic()
+        costs = {"requests": 1, "tokens": tokens}
+        headers = {}
+        with self._lock:
+            levels = {}
+            for kind, limit in self.limits.items():
+                if not limit:
+                    continue
+                level, updated = self._buckets.get((model, kind), (limit, now))
+                levels[kind] = min(limit, level + (now - updated) * limit / self.window)
+            allowed = all(
+                levels[kind] >= min(costs[kind], self.limits[kind]) for kind in levels
+            )
+            wait = 0.0
+            for kind, level in levels.items():
+                limit = self.limits[kind]
+                if allowed:
+                    level -= costs[kind]
+                else:
+                    shortfall = min(costs[kind], limit) - level
+                    wait = max(wait, shortfall * self.window / limit)
+                self._buckets[(model, kind)] = [level, now]
+                headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(level)))
+                reset = (limit - level) * self.window / limit
+                headers[f"x-ratelimit-reset-{kind}"] = f"{reset:.3f}s"
+        if not allowed:
+            headers["retry-after"] = str(max(1, round(wait)))
+            headers["retry-after-ms"] = str(int(wait * 1000))
+        return allowed, headers
+
+
+class PrefixCache:
+    """Prompt prefixes seen before, in ``step``-token steps from ``minimum``."""
+
+    def __init__(self, minimum: int = 1024, step: int = 128):
+        self.minimum = minimum
+        self.step = step
+        self._seen: set[bytes] = set()
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, body: dict) -> int:
+        """Tokens of the prompt in ``body`` already seen, then remember it."""
+        if "messages" in body:
+            text = "".join(
+                f"{m.get('role')}: {m.get('content') or ''}\n" for m in body["messages"]
+            )
+        else:
+            text = str(body.get("prompt", ""))
+        data = text.encode()
+        digest = hashlib.blake2b(digest_size=16)
+        prefixes, offset = [], 0
+        # _tokens counts four bytes of text per token
+        for tokens in range(self.minimum, _tokens(text) + 1, self.step):
+            digest.update(data[offset : tokens * 4])
+            offset = tokens * 4
+            prefixes.append((tokens, digest.copy().digest()))
+        cached = 0
+        with self._lock:
+            for tokens, key in prefixes:
+                if key not in self._seen:
+                    break
+                cached = tokens
+            self._seen.update(key for _, key in prefixes)
+        return cached
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+    distribution = "constant"
+    chunk_delay = 0.0
+    chunk_words = 1
+    error_rate = 0.0
+    throttle_rate = 0.0
+    template = TEMPLATE
+    canned: dict[str, str] = {}
+    rate_limit: RateLimit | None = None
+    prefix_cache: PrefixCache | None = None
+    rng = random.Random(0)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, chunks: list[dict]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks]
+        for event in events + ["data: [DONE]\n\n"]:
+            data = event.encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            time.sleep(self.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            body = multipart(content_type, data)
+        else:
+            body = json.loads(data or b"{}")
+        headers = {}
+        if self.rate_limit is not None:
+            prompt = body.get("messages") or body.get("prompt") or body.get("input")
+            tokens = _tokens(json.dumps(prompt)) + int(body.get("max_tokens") or 0)
+            allowed, headers = self.rate_limit.take(str(body.get("model")), tokens)
+            if not allowed:
+                error = {"message": "Rate limit reached", "type": "requests"}
+                self._send(429, {"error": error}, headers)
+                return
+        time.sleep(delay(self.latency, self.distribution, self.rng))
+        draw = self.rng.random()
+        if draw < self.throttle_rate:
+            error = {"message": "Rate limit reached (injected)", "type": "requests"}
+            self._send(429, {"error": error}, {**headers, "retry-after-ms": "100"})
+            return
+        if draw < self.throttle_rate + self.error_rate:
+            error = {"message": "Internal error (injected)", "type": "server_error"}
+            self._send(500, {"error": error}, headers)
+            return
+        path = self.path.rstrip("/")
+        replies = {"template": self.template, "canned": self.canned}
+        if path.endswith(("/audio/transcriptions", "/audio/translations")):
+            self._send(200, transcription(body), headers)
+        elif path.endswith("/moderations"):
+            self._send(200, moderation(body), headers)
+        elif path.endswith("/chat/completions") and body.get("stream"):
+            self._stream(chat_chunks(body, self.chunk_words, **replies))
+        elif path.endswith("/completions"):
+            if path.endswith("/chat/completions"):
+                payload = chat_completion(body, **replies)
+            else:
+                payload = completion(body, **replies)
+            if self.prefix_cache is not None:
+                cached = self.prefix_cache.cached_tokens(body)
+                payload["usage"]["prompt_tokens_details"] = {"cached_tokens": cached}
+            self._send(200, payload, headers)
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency: float = 0.0,
+    chunk_delay: float = 0.0,
+    rpm: int | None = None,
+    tpm: int | None = None,
+    window: float = 60.0,
+    distribution: str = "constant",
+    chunk_words: int = 1,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    template: str = TEMPLATE,
+    canned: dict[str, str] | None = None,
+    seed: int = 0,
+) -> tuple[Server, str]:
+    """Start the server in a daemon thread and return it with its base URL."""
+    options = {
+        "latency": latency,
+        "distribution": distribution,
+        "chunk_delay": chunk_delay,
+        "chunk_words": chunk_words,
+        "error_rate": error_rate,
+        "throttle_rate": throttle_rate,
+        "template": template,
+        "canned": canned or {},
+        "rng": random.Random(seed),
+        "prefix_cache": PrefixCache(),
+    }
+    if rpm or tpm:
+        options["rate_limit"] = RateLimit(rpm, tpm, window)
+    handler = type("Handler", (Handler,), options)
+    server = Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="constant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--chunk-delay", type=float, default=0.0, help="seconds between chunks"
+    )
+    parser.add_argument("--chunk-words", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500s")
+    parser.add_argument(
+        "--429-rate", dest="throttle_rate", type=float, default=0.0, help="429s"
+    )
+    parser.add_argument("--reply", default=TEMPLATE, help="template with {prompt}")
+    parser.add_argument(
+        "--replies", help="JSON file mapping prompt substrings to replies"
+    )
+    parser.add_argument("--rpm", type=int, help="requests per window and model")
+    parser.add_argument("--tpm", type=int, help="tokens per window and model")
+    parser.add_argument("--window", type=float, default=60.0, help="seconds")
+    args = parser.parse_args()
+
+    canned = None
+    if args.replies:
+        with open(args.replies) as file:
+            canned = json.load(file)
+    server, base_url = serve(
+        args.host,
+        args.port,
+        args.latency,
+        args.chunk_delay,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        window=args.window,
+        distribution=args.distribution,
+        chunk_words=args.chunk_words,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        template=args.reply,
+        canned=canned,
+        seed=args.seed,
+    )
+    print(f"Serving on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Moderation gate for reviews and chat messages.
+
+``ModerationGate.check(texts)`` screens many texts at once:
+
+1. A local regular expression passes text that contains none of its risky
+   words without any network call.
+2. Verdicts already seen are served from a cache keyed by a hash of the
+   model and text.
+3. The rest are de-duplicated and sent in batches (the endpoint takes a list
+   of inputs), several batches at a time.
+
+``thresholds`` overrides the endpoint's decision per category, e.g.
+``{"violence": 0.2}`` flags any text scoring 0.2 or more for violence.
+"""
+
+import json
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from openai import OpenAI
+
+from clients import get_client
+from response_cache import MemoryTier, ResponseCache, cache_key
+
+MODEL = "text-moderation-latest"
+
+# Stems of words that may need moderation; anything else is passed locally.
+# False positives only cost an API call, so the list errs on the broad side.
+RISKY = re.compile(
+    r"\b(kill|murder|dead|death|die|blood|gun|shoot|knife|stab|weapon|bomb|"
+    r"attack|hurt|harm|suicid|sex|nude|naked|porn|rape|drug|cocaine|heroin|"
+    r"meth|hate|racis|nazi|terror|idiot|stupid|dumb|slut|whore|bitch|fuck|"
+    r"shit|threat|abuse|assault|violen)",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Verdict:
+    flagged: bool
+    categories: dict[str, bool] = field(default_factory=dict)
+    scores: dict[str, float] = field(default_factory=dict)
+    source: str = "api"
+
+
+class ModerationGate:
+    def __init__(
+        self,
+        client: OpenAI | None = None,
+        model: str = MODEL,
+        thresholds: dict[str, float] | None = None,
+        batch_size: int = 32,
+        concurrency: int = 4,
+        local: re.Pattern | None = RISKY,
+        cache: ResponseCache | None = None,
+    ):
+        self.client = client
+        self.model = model
+        self.thresholds = thresholds or {}
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.local = local
+        self.cache = cache or ResponseCache([MemoryTier(maxsize=100_000)])
+        self.stats: Counter[str] = Counter()
+
+    def _key(self, text: str) -> str:
+        return cache_key("/moderations", {"model": self.model, "input": text})
+
+    def _verdict(self, result: dict, source: str) -> Verdict:
+        scores = result["category_scores"]
+        categories = {
+            category: (
+                # A category the model did not score counts as 0
+                (scores.get(category) or 0.0) >= self.thresholds[category]
+                if category in self.thresholds
+                else bool(flagged)
+            )
+            for category, flagged in result["categories"].items()
+        }
+        return Verdict(any(categories.values()), categories, scores, source)
+
+    def _request(self, texts: list[str]) -> list[dict]:
+        response = (self.client or get_client()).moderations.create(
+            model=self.model, input=texts
+        )
+        return [
+            {
+                "categories": result.categories.model_dump(by_alias=True),
+                "category_scores": result.category_scores.model_dump(by_alias=True),
+            }
+            for result in response.results
+        ]
+
+    def check(self, texts: list[str]) -> list[Verdict]:
+        """One verdict per text, in order."""
+        verdicts: list[Verdict | None] = [None] * len(texts)
+        waiting: dict[str, list[int]] = {}
+        for index, text in enumerate(texts):
+            if self.local is not None and not self.local.search(text):
+                verdicts[index] = Verdict(False, source="local")
+                self.stats["local"] += 1
+                continue
+            cached = self.cache.get(self._key(text))
+            if cached is not None:
+                verdicts[index] = self._verdict(json.loads(cached), "cache")
+                self.stats["cache"] += 1
+                continue
+            waiting.setdefault(text, []).append(index)
+
+        unique = list(waiting)
+        batches = [
+            unique[i : i + self.batch_size]
+            for i in range(0, len(unique), self.batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for batch, results in zip(batches, pool.map(self._request, batches)):
+                self.stats["requests"] += 1
+                for text, result in zip(batch, results):
+                    self.cache.set(self._key(text), json.dumps(result).encode())
+                    verdict = self._verdict(result, "api")
+                    for index in waiting[text]:
+                        verdicts[index] = verdict
+                    self.stats["api"] += len(waiting[text])
+        return verdicts
+
+    def allowed(self, text: str) -> bool:
+        return not self.check([text])[0].flagged
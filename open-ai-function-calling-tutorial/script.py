@@ -1,7 +1,11 @@
 import os
-from openai import OpenAI
+import sys
 
-client = OpenAI(
+# clients.py is in the repository root, one folder up
+sys.path.append("..")
+from clients import get_client
+
+client = get_client(
     api_key=os.environ['OPENAI_API_KEY'],
 )
 
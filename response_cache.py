@@ -0,0 +1,195 @@
+"""Cache for deterministic (``temperature=0``) completions.
+
+Requests are keyed on a hash of their endpoint and canonical JSON body, which
+covers the model, messages or prompt, temperature, max_tokens and functions.
+Lookups go through the tiers in order (an in-memory LRU, then SQLite on disk)
+and a hit in a slower tier is copied into the faster ones.
+
+Enable it for every client from ``clients.get_client`` with
+``OPENAI_RESPONSE_CACHE=responses.sqlite``; ``OPENAI_RESPONSE_CACHE_TTL``
+(seconds) and ``OPENAI_RESPONSE_CACHE_MB`` bound the disk tier.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+import httpx
+
+from middleware import Middleware, endpoint, request_json
+
+CACHEABLE = {"/chat/completions", "/completions"}
+
+
+def cache_key(path: str, body: dict) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{path}\n{canonical}".encode()).hexdigest()
+
+
+class Tier(Protocol):
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes) -> None: ...
+
+
+class MemoryTier:
+    """Least-recently-used cache of up to ``maxsize`` responses."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class SQLiteTier:
+    """Disk cache; entries expire after ``ttl`` seconds and the least recently
+    used ones are evicted once the total exceeds ``max_bytes``."""
+
+    def __init__(
+        self, path: str, ttl: float | None = None, max_bytes: int | None = None
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+            "value BLOB, size INTEGER, created REAL, accessed REAL)"
+        )
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            return row[0]
+
+    def set(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            if self.max_bytes is not None:
+                self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed")
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+
+class ResponseCache:
+    def __init__(self, tiers: list[Tier]):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> bytes | None:
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        for tier in self.tiers:
+            tier.set(key, value)
+
+
+def from_env() -> ResponseCache | None:
+    path = os.environ.get("OPENAI_RESPONSE_CACHE")
+    if not path:
+        return None
+    ttl = os.environ.get("OPENAI_RESPONSE_CACHE_TTL")
+    size = os.environ.get("OPENAI_RESPONSE_CACHE_MB")
+    disk = SQLiteTier(
+        path,
+        ttl=float(ttl) if ttl else None,
+        max_bytes=int(float(size) * 2**20) if size else None,
+    )
+    return ResponseCache([MemoryTier(), disk])
+
+
+class CacheMiddleware(Middleware):
+    """Serves repeated ``temperature=0`` completions from a ``ResponseCache``."""
+
+    def __init__(self, inner, cache: ResponseCache):
+        super().__init__(inner)
+        self.cache = cache
+
+    def _key(self, request: httpx.Request) -> str | None:
+        path = endpoint(request)
+        if request.method != "POST" or path not in CACHEABLE:
+            return None
+        body = request_json(request)
+        if not body or body.get("temperature") != 0 or body.get("stream"):
+            return None
+        return cache_key(path, body)
+
+    def _hit(self, request: httpx.Request, key: str | None) -> httpx.Response | None:
+        value = self.cache.get(key) if key else None
+        if value is None:
+            return None
+        headers = {"content-type": "application/json", "x-cache": "hit"}
+        return httpx.Response(200, content=value, headers=headers, request=request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = self._key(request)
+        response = self._hit(request, key)
+        if response is None:
+            response = self.inner.handle_request(request)
+            if key and response.status_code == 200:
+                self.cache.set(key, response.read())
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = self._key(request)
+        response = self._hit(request, key)
+        if response is None:
+            response = await self.inner.handle_async_request(request)
+            if key and response.status_code == 200:
+                self.cache.set(key, await response.aread())
+        return response
@@ -0,0 +1,248 @@
+"""Label the clothing reviews with sentiment, topics and sizing complaints.
+
+The CSV is read row by row and many reviews are packed into each prompt,
+tagged with their ``Review ID``. Prompts are sent concurrently and the labels
+are appended to a Parquet file as they arrive, so memory stays bounded by the
+number of requests in flight regardless of the size of the CSV. A batch whose
+request fails gets null labels, like reviews missing from a reply.
+
+With near-duplicate detection on, the labels of every review sent are kept
+until the end for the duplicates that copy them: an id and a shared label
+tuple per distinct review, on top of the MinHash index, so memory then grows
+with the number of distinct reviews.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from collections.abc import Iterator
+
+import openai
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openai import AsyncOpenAI
+
+from chat import MODEL, estimate_tokens
+from clients import get_async_client
+from dedup import NearDuplicates
+
+SENTIMENTS = ("positive", "neutral", "negative")
+TOPICS = ("fit", "size", "quality", "fabric", "style", "comfort", "color", "price")
+
+SCHEMA = pa.schema(
+    [
+        ("review_id", pa.int64()),
+        ("sentiment", pa.dictionary(pa.int8(), pa.string())),
+        ("topics", pa.list_(pa.string())),
+        ("sizing_complaint", pa.bool_()),
+    ]
+)
+
+INSTRUCTIONS = (
+    "You label customer reviews of clothing. Each review below starts with "
+    "its ID in square brackets. For every review return an object with: "
+    f"id (the number), sentiment ({', '.join(SENTIMENTS)}), "
+    f"topics (a list using only: {', '.join(TOPICS)}) and sizing_complaint "
+    "(true if the reviewer says it runs small or large, otherwise false). "
+    'Reply with JSON only: {"reviews": [...]}'
+)
+
+Row = dict[str, object]
+# (sentiment, topics, sizing_complaint) of a row, with topics as a tuple
+Labels = tuple[str | None, tuple[str, ...] | None, bool | None]
+
+
+def read_reviews(path: str) -> Iterator[tuple[int, str]]:
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            yield int(row["Review ID"]), row["Review Text"].strip()
+
+
+def pack(
+    reviews: Iterator[tuple[int, str]], batch_tokens: int, batch_size: int
+) -> Iterator[list[tuple[int, str]]]:
+    """Group reviews into batches of at most ``batch_tokens`` estimated tokens."""
+    batch: list[tuple[int, str]] = []
+    tokens = 0
+    for review_id, text in reviews:
+        size = estimate_tokens([{"content": text}])
+        if batch and (tokens + size > batch_tokens or len(batch) == batch_size):
+            yield batch
+            batch, tokens = [], 0
+        batch.append((review_id, text))
+        tokens += size
+    if batch:
+        yield batch
+
+
+def parse_labels(batch: list[tuple[int, str]], content: str | None) -> list[Row]:
+    """Typed rows for ``batch``; reviews missing from the reply get nulls."""
+    try:
+        labels = json.loads(content or "")["reviews"]
+    except (ValueError, KeyError, TypeError):
+        labels = []
+    by_id = {}
+    for label in labels:
+        if isinstance(label, dict) and str(label.get("id", "")).isdigit():
+            by_id[int(label["id"])] = label
+    rows = []
+    for review_id, _ in batch:
+        label = by_id.get(review_id, {})
+        sentiment = str(label.get("sentiment", "")).lower()
+        topics = label.get("topics")
+        sizing = label.get("sizing_complaint")
+        rows.append(
+            {
+                "review_id": review_id,
+                "sentiment": sentiment if sentiment in SENTIMENTS else None,
+                "topics": (
+                    [t for t in topics if t in TOPICS]
+                    if isinstance(topics, list)
+                    else None
+                ),
+                "sizing_complaint": sizing if isinstance(sizing, bool) else None,
+            }
+        )
+    return rows
+
+
+async def label(
+    source: str,
+    output: str,
+    model: str = MODEL,
+    concurrency: int = 8,
+    batch_tokens: int = 3000,
+    batch_size: int = 50,
+    flush_rows: int = 10_000,
+    client: AsyncOpenAI | None = None,
+    duplicates: NearDuplicates | None = None,
+) -> int:
+    """Label every review in ``source`` into ``output``; return the request count.
+
+    With ``duplicates``, only the first review of each near-duplicate cluster
+    is sent and its labels are copied to the other members.
+    """
+    client = client or get_async_client()
+    copies: list[tuple[int, int]] = []
+    # Few distinct labels occur, so each is stored once and shared
+    labelled: dict[int, Labels] = {}
+    shared: dict[Labels, Labels] = {}
+
+    def unique(reviews: Iterator[tuple[int, str]]) -> Iterator[tuple[int, str]]:
+        for review_id, text in reviews:
+            representative = duplicates.add(review_id, text) if text else review_id
+            if representative == review_id:
+                yield review_id, text
+            else:
+                copies.append((review_id, representative))
+
+    async def request(batch: list[tuple[int, str]]) -> list[Row]:
+        texts = [(i, t) for i, t in batch if t]
+        if not texts:
+            return parse_labels(batch, None)
+        prompt = "\n".join(f"[{i}] {' '.join(t.split())}" for i, t in texts)
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": INSTRUCTIONS},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0,
+                response_format={"type": "json_object"},
+            )
+        except openai.APIError as error:
+            first, last = batch[0][0], batch[-1][0]
+            print(f"Reviews {first}-{last}: {error}", file=sys.stderr)
+            return parse_labels(batch, None)
+        return parse_labels(batch, response.choices[0].message.content)
+
+    requests = 0
+    rows: list[Row] = []
+    pending: set[asyncio.Task] = set()
+    reviews = read_reviews(source)
+    batches = pack(unique(reviews) if duplicates else reviews, batch_tokens, batch_size)
+    with pq.ParquetWriter(output, SCHEMA) as writer:
+
+        def flush() -> None:
+            if duplicates:
+                for row in rows:
+                    topics = row["topics"]
+                    labels = (
+                        row["sentiment"],
+                        None if topics is None else tuple(topics),
+                        row["sizing_complaint"],
+                    )
+                    labelled[row["review_id"]] = shared.setdefault(labels, labels)
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=SCHEMA))
+                rows.clear()
+
+        for batch in batches:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    rows.extend(task.result())
+                if len(rows) >= flush_rows:
+                    flush()
+            pending.add(asyncio.create_task(request(batch)))
+            requests += 1
+        for rows_done in await asyncio.gather(*pending):
+            rows.extend(rows_done)
+        flush()
+        for review_id, representative in copies:
+            sentiment, topics, sizing = labelled[representative]
+            rows.append(
+                {
+                    "review_id": review_id,
+                    "sentiment": sentiment,
+                    "topics": None if topics is None else list(topics),
+                    "sizing_complaint": sizing,
+                }
+            )
+            if len(rows) >= flush_rows:
+                flush()
+        flush()
+    return requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="reviews CSV")
+    parser.add_argument("-o", "--output", default="labels.parquet")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-tokens", type=int, default=3000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument(
+        "--dedup",
+        type=float,
+        metavar="THRESHOLD",
+        help="send near-duplicate reviews once (e.g. 0.8)",
+    )
+    args = parser.parse_args()
+
+    duplicates = NearDuplicates(args.dedup) if args.dedup else None
+
+    requests = asyncio.run(
+        label(
+            args.source,
+            args.output,
+            model=args.model,
+            concurrency=args.concurrency,
+            batch_tokens=args.batch_tokens,
+            batch_size=args.batch_size,
+            duplicates=duplicates,
+        )
+    )
+    print(f"Labelled {args.source} into {args.output} with {requests} requests")
+    if duplicates:
+        print(f"Near-duplicates saved labelling {duplicates.reviews_skipped} reviews")
+
+
+if __name__ == "__main__":
+    main()
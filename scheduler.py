@@ -0,0 +1,245 @@
+"""Adaptive, rate-limit-aware scheduling of API requests.
+
+``SchedulerMiddleware`` holds every request until its model has room for it:
+
+* a concurrency limit per model that grows by one per limit's worth of
+  successful requests and halves on a 429 (additive increase,
+  multiplicative decrease);
+* request and token buckets per model, kept in step with the
+  ``x-ratelimit-remaining-*`` and ``x-ratelimit-reset-*`` response headers;
+* a pause for the whole model after a 429, for as long as ``retry-after``
+  says, after which the request is retried here instead of failing.
+
+Requests are interactive unless made inside ``with scheduler.batch():`` (or
+sent with an ``x-priority: batch`` header); batch requests wait while
+interactive ones are waiting and leave one slot free for them.
+
+Enable it for every client from ``clients.get_client`` with
+``OPENAI_SCHEDULER=1``.
+"""
+
+import asyncio
+import contextvars
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import httpx
+
+import budget
+from middleware import Middleware, request_json
+
+_priority = contextvars.ContextVar("priority", default="interactive")
+
+_DURATION = re.compile(
+    r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?"
+    r"(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$"
+)
+
+
+@contextmanager
+def batch() -> Iterator[None]:
+    """Send the requests made inside the block at batch priority."""
+    token = _priority.set("batch")
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_duration(value: str) -> float | None:
+    """Seconds in a reset header such as ``"6m0s"``, ``"1.5s"`` or ``"20ms"``."""
+    match = _DURATION.match(value.strip())
+    if not value.strip() or not match:
+        return None
+    hours, minutes, seconds, millis = (float(g) if g else 0.0 for g in match.groups())
+    return hours * 3600 + minutes * 60 + seconds + millis / 1000
+
+
+class Bucket:
+    """Token bucket whose level and refill rate follow the server's headers."""
+
+    def __init__(self, limit: float, rate: float):
+        self.limit = limit
+        self.rate = rate
+        self.level = limit
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.limit, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.limit)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def update(self, limit: float, remaining: float, reset: float | None) -> None:
+        self.limit = limit
+        self.level = min(self.level, remaining)
+        if reset and remaining < limit:
+            # The bucket refills from ``remaining`` to ``limit`` in ``reset``
+            self.rate = (limit - remaining) / reset
+
+
+class ModelSchedule:
+    """Concurrency limit, buckets and pause for one model."""
+
+    def __init__(self, initial: float, maximum: float):
+        self.limit = initial
+        self.maximum = maximum
+        self.in_flight = 0
+        self.waiting_interactive = 0
+        self.paused_until = 0.0
+        self.buckets: dict[str, Bucket] = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def wait_time(self, priority: str, tokens: int) -> float:
+        """Seconds to wait, or 0 after taking a slot (call with ``lock`` held)."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        slots = int(self.limit)
+        if priority == "batch":
+            if self.waiting_interactive:
+                return 0.01
+            slots = max(1, slots - 1)
+        if self.in_flight >= slots:
+            return 0.01
+        costs = {"requests": 1, "tokens": tokens}
+        wait = 0.0
+        for kind, bucket in self.buckets.items():
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_time(costs[kind]))
+        if wait:
+            return wait
+        for kind, bucket in self.buckets.items():
+            bucket.level -= costs[kind]
+        self.in_flight += 1
+        return 0.0
+
+    def release(self, response: httpx.Response | None) -> None:
+        """Free the slot and learn from ``response`` (call with ``lock`` held)."""
+        self.in_flight -= 1
+        self.changed.notify_all()
+        if response is None:
+            return
+        headers = response.headers
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if limit is None or remaining is None:
+                continue
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+            if kind not in self.buckets:
+                rate = float(limit) / 60
+                self.buckets[kind] = Bucket(float(limit), rate)
+            self.buckets[kind].update(float(limit), float(remaining), reset)
+        if response.status_code == 429:
+            now = time.monotonic()
+            # Halve once per pause, not once for each request it rejects
+            if now >= self.paused_until:
+                self.limit = max(1.0, self.limit / 2)
+            retry_after = headers.get("retry-after-ms")
+            delay = (
+                float(retry_after) / 1000
+                if retry_after
+                else float(headers.get("retry-after", 1))
+            )
+            self.paused_until = max(self.paused_until, now + delay)
+        elif response.status_code < 400:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+class SchedulerMiddleware(Middleware):
+    def __init__(
+        self,
+        inner,
+        initial: float = 4,
+        maximum: float = 64,
+        max_retries: int = 6,
+    ):
+        super().__init__(inner)
+        self.initial = initial
+        self.maximum = maximum
+        self.max_retries = max_retries
+        self.models: dict[str, ModelSchedule] = {}
+        self._lock = threading.Lock()
+
+    def _plan(self, request: httpx.Request) -> tuple[ModelSchedule, str, int]:
+        body = request_json(request) or {}
+        model = str(body.get("model", "default"))
+        with self._lock:
+            if model not in self.models:
+                self.models[model] = ModelSchedule(self.initial, self.maximum)
+            schedule = self.models[model]
+        if "messages" in body:
+            tokens = budget.count_messages(body["messages"], model)
+        else:
+            prompt = body.get("prompt") or body.get("input") or ""
+            tokens = budget.count(str(prompt), model)
+        tokens += int(body.get("max_tokens") or 0)
+        priority = request.headers.get("x-priority", _priority.get())
+        return schedule, priority, tokens
+
+    def _acquire(self, schedule: ModelSchedule, priority: str, tokens: int) -> None:
+        with schedule.changed:
+            waiting = False
+            while wait := schedule.wait_time(priority, tokens):
+                if priority != "batch" and not waiting:
+                    schedule.waiting_interactive += 1
+                    waiting = True
+                schedule.changed.wait(wait)
+            if waiting:
+                schedule.waiting_interactive -= 1
+
+    async def _aacquire(
+        self, schedule: ModelSchedule, priority: str, tokens: int
+    ) -> None:
+        waiting = False
+        try:
+            while True:
+                with schedule.lock:
+                    wait = schedule.wait_time(priority, tokens)
+                    if wait and priority != "batch" and not waiting:
+                        schedule.waiting_interactive += 1
+                        waiting = True
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            if waiting:
+                with schedule.lock:
+                    schedule.waiting_interactive -= 1
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        schedule, priority, tokens = self._plan(request)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(schedule, priority, tokens)
+            response = None
+            try:
+                response = self.inner.handle_request(request)
+            finally:
+                with schedule.lock:
+                    schedule.release(response)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            response.read()
+            response.close()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        schedule, priority, tokens = self._plan(request)
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire(schedule, priority, tokens)
+            response = None
+            try:
+                response = await self.inner.handle_async_request(request)
+            finally:
+                with schedule.lock:
+                    schedule.release(response)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            await response.aread()
+            await response.aclose()
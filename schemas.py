@@ -0,0 +1,232 @@
+"""Typed records compiled from function-calling schemas.
+
+``compile_functions(custom_functions)`` turns each function schema into a
+slotted dataclass whose ``decode`` parses the model's JSON arguments and
+validates and coerces every field in a single pass over pre-built
+converters, so ``grades`` comes back as ``3.8`` whether the model sent
+``3.8``, ``"3.8"`` or ``"3.8 GPA"``::
+
+    records = compile_functions(custom_functions)
+    student = records["extract_student_info"].decode(call.arguments)
+    student.grades  # 3.8
+
+Replies that still do not fit the schema raise ``ArgumentError``;
+``RepairQueue`` collects them so they can be retried with the model, and
+``dispatch.adispatch`` sends each one back to the model once as it happens.
+"""
+
+import json
+import re
+from collections.abc import Callable
+from dataclasses import field, fields, make_dataclass
+
+from openai import OpenAI
+
+from chat import MODEL
+from clients import get_client
+
+_NUMBER = re.compile(r"[-+]?(\d[\d,]*)?\.?\d+(e[-+]?\d+)?", re.IGNORECASE)
+
+
+class ArgumentError(ValueError):
+    """Raised when a function call's arguments do not match its schema."""
+
+
+def _number(name: str, integer: bool) -> Callable:
+    def convert(value):
+        if isinstance(value, str):
+            # Accept "3.8", "3.8 GPA" and "17,000 students"
+            match = _NUMBER.search(value)
+            if not match:
+                raise ArgumentError(f"{name}: expected a number, got {value!r}")
+            value = float(match[0].replace(",", ""))
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ArgumentError(f"{name}: expected a number, got {value!r}")
+        # Models ignore the integer/number distinction (a GPA of 3.8 is
+        # declared as an integer in the tutorial), so only whole values
+        # become ints
+        if integer and float(value).is_integer():
+            return int(value)
+        return value
+
+    return convert
+
+
+def _string(name: str) -> Callable:
+    def convert(value):
+        if isinstance(value, (dict, list)):
+            raise ArgumentError(f"{name}: expected a string, got {value!r}")
+        return str(value)
+
+    return convert
+
+
+def _boolean(name: str) -> Callable:
+    words = {"true": True, "yes": True, "false": False, "no": False}
+
+    def convert(value):
+        if isinstance(value, str) and value.lower() in words:
+            return words[value.lower()]
+        if not isinstance(value, bool):
+            raise ArgumentError(f"{name}: expected a boolean, got {value!r}")
+        return value
+
+    return convert
+
+
+def _array(name: str, item: Callable | None) -> Callable:
+    def convert(value):
+        if not isinstance(value, list):
+            value = [value]
+        return value if item is None else [item(v) for v in value]
+
+    return convert
+
+
+def converter(name: str, schema: dict) -> Callable | None:
+    """Function that validates and coerces one value, ``None`` for any value."""
+    kind = schema.get("type")
+    if kind in ("integer", "number"):
+        convert = _number(name, kind == "integer")
+    elif kind == "string":
+        convert = _string(name)
+    elif kind == "boolean":
+        convert = _boolean(name)
+    elif kind == "array":
+        convert = _array(name, converter(name, schema.get("items", {})))
+    else:
+        convert = None
+    if "enum" in schema:
+        allowed = set(schema["enum"])
+        inner = convert or (lambda value: value)
+
+        def convert(value):
+            value = inner(value)
+            if value not in allowed:
+                raise ArgumentError(f"{name}: {value!r} is not one of {allowed}")
+            return value
+
+    return convert
+
+
+_TYPES = {"integer": int | float, "number": float, "string": str, "boolean": bool}
+
+
+def record_class(function: dict) -> type:
+    """Slotted dataclass for the arguments of ``function``."""
+    schema = function.get("parameters", {})
+    properties = schema.get("properties", {})
+    # The tutorial schemas list no "required", so every property is needed
+    required = set(schema.get("required", properties))
+    ordered = [key for key in properties if key in required]
+    ordered += [key for key in properties if key not in required]
+    plan = tuple(
+        (key, converter(key, properties[key]), key in required) for key in ordered
+    )
+    name = function["name"]
+
+    def decode(cls, arguments: str | bytes | dict):
+        """Parse, validate and coerce the arguments of a call to ``name``."""
+        if not isinstance(arguments, dict):
+            try:
+                arguments = json.loads(arguments)
+            except json.JSONDecodeError as error:
+                raise ArgumentError(f"{name}: invalid JSON arguments: {error}")
+            if not isinstance(arguments, dict):
+                raise ArgumentError(f"{name}: expected an object, got {arguments!r}")
+        values = []
+        for key, convert, needed in plan:
+            value = arguments.get(key)
+            if value is None:
+                if needed:
+                    raise ArgumentError(f"{name}: missing {key}")
+            elif convert is not None:
+                value = convert(value)
+            values.append(value)
+        return cls(*values)
+
+    def as_kwargs(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    spec = [
+        (
+            (key, _TYPES.get(properties[key].get("type"), object))
+            if needed
+            else (
+                key,
+                _TYPES.get(properties[key].get("type"), object) | None,
+                field(default=None),
+            )
+        )
+        for key, _, needed in plan
+    ]
+    class_name = "".join(part.title() for part in name.split("_"))
+    record = make_dataclass(
+        class_name,
+        spec,
+        slots=True,
+        namespace={"decode": classmethod(decode), "as_kwargs": as_kwargs},
+    )
+    record.__module__ = __name__
+    return record
+
+
+def compile_functions(functions: list[dict]) -> dict[str, type]:
+    """Record class for each function, by function name."""
+    return {function["name"]: record_class(function) for function in functions}
+
+
+def repair_request(function: dict, arguments: str, error: str) -> dict:
+    """Chat completion arguments asking the model to correct a failed call."""
+    name = function["name"]
+    return {
+        "messages": [
+            {
+                "role": "user",
+                "content": f"These arguments for {name} are invalid "
+                f"({error}). Call {name} again with corrected "
+                f"arguments:\n{arguments}",
+            }
+        ],
+        "functions": [function],
+        "function_call": {"name": name},
+        "temperature": 0,
+    }
+
+
+class RepairQueue:
+    """Collects arguments that failed to decode and asks the model to fix them."""
+
+    def __init__(self, records: dict[str, type], functions: list[dict]):
+        self.records = records
+        self.functions = {function["name"]: function for function in functions}
+        self.failed: list[tuple[str, str, str]] = []
+
+    def decode(self, name: str, arguments: str):
+        """The decoded record, or ``None`` after queueing the arguments."""
+        try:
+            return self.records[name].decode(arguments)
+        except ArgumentError as error:
+            self.failed.append((name, arguments, str(error)))
+            return None
+
+    def repair(
+        self, client: OpenAI | None = None, model: str = MODEL
+    ) -> tuple[list, list[tuple[str, str, str]]]:
+        """Retry every queued call once; return the records and what still fails."""
+        client = client or get_client()
+        repaired, failed = [], []
+        for name, arguments, error in self.failed:
+            response = client.chat.completions.create(
+                model=model,
+                **repair_request(self.functions[name], arguments, error),
+            )
+            call = response.choices[0].message.function_call
+            try:
+                if call is None:
+                    raise ArgumentError(f"{name}: the reply has no function call")
+                repaired.append(self.records[name].decode(call.arguments))
+            except ArgumentError as retry_error:
+                failed.append((name, arguments, str(retry_error)))
+        self.failed = []
+        return repaired, failed
@@ -0,0 +1,346 @@
+"""Scrape a DataCamp course into ``scrape.html``.
+
+Python port of ``scrape.R``: the exercise links are read from the course page
+and the exercise pages are fetched concurrently over keep-alive connections.
+Pages are kept in an on-disk cache and revalidated with conditional requests
+on later runs.
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.client
+import queue
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from httpcache import CACHE_DIR, HTTPCache
+
+COURSE_URL = "https://www.datacamp.com/courses/working-with-the-openai-api"
+
+INSTRUCTIONS_HEADING = "<strong>Instructions</strong>"
+SOLUTIONS_HEADING = "<strong>Answer</strong>"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+@dataclass
+class Response:
+    url: str
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    @property
+    def text(self) -> str:
+        charset = "utf-8"
+        for part in self.headers.get("content-type", "").split(";"):
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                charset = value.strip('"')
+        return self.body.decode(charset, errors="replace")
+
+
+class FetchError(Exception):
+    """Raised when a URL cannot be fetched after all retries."""
+
+
+@dataclass
+class _HostPool:
+    """Idle keep-alive connections and a concurrency limit for one host."""
+
+    limit: threading.BoundedSemaphore
+    idle: queue.LifoQueue = field(default_factory=queue.LifoQueue)
+
+
+class Fetcher:
+    """Thread-safe HTTP client with per-host connection pools and retries."""
+
+    def __init__(
+        self,
+        per_host: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        user_agent: str = "scrape-datacamp",
+    ):
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self._pools: dict[tuple[str, str], _HostPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, key: tuple[str, str]) -> _HostPool:
+        with self._lock:
+            if key not in self._pools:
+                limit = threading.BoundedSemaphore(self.per_host)
+                self._pools[key] = _HostPool(limit)
+            return self._pools[key]
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _request(self, url: str, headers: dict[str, str]) -> Response:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {
+            "User-Agent": self.user_agent,
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+            **headers,
+        }
+
+        pool = self._pool(key)
+        with pool.limit:
+            try:
+                conn = pool.idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect(*key)
+            try:
+                conn.request("GET", path, headers=headers)
+                raw = conn.getresponse()
+                body = raw.read()
+            except Exception:
+                conn.close()
+                raise
+            if raw.will_close:
+                conn.close()
+            else:
+                pool.idle.put(conn)
+
+        encoding = raw.getheader("Content-Encoding", "")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        response_headers = {k.lower(): v for k, v in raw.getheaders()}
+        return Response(url, raw.status, response_headers, body)
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """GET ``url``, following redirects and retrying transient failures."""
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                response = self._follow(url, headers or {})
+            except (OSError, http.client.HTTPException) as error:
+                failure: object = error
+            else:
+                if response.status not in RETRY_STATUSES:
+                    return response
+                failure = f"HTTP {response.status}"
+            if attempt < self.retries:
+                time.sleep(self._delay(attempt, response))
+        raise FetchError(f"{url}: {failure}")
+
+    def _follow(self, url: str, headers: dict[str, str]) -> Response:
+        for _ in range(5):
+            response = self._request(url, headers)
+            if response.status not in REDIRECT_STATUSES:
+                return response
+            url = urljoin(url, response.headers.get("location", ""))
+        return response
+
+    def _delay(self, attempt: int, response: Response | None) -> float:
+        retry_after = response.headers.get("retry-after") if response else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                while not pool.idle.empty():
+                    pool.idle.get_nowait().close()
+            self._pools.clear()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CachingFetcher:
+    """Serve pages from an ``HTTPCache``, revalidating them with ``fetcher``.
+
+    In offline mode the network is never touched and uncached URLs fail.
+    """
+
+    def __init__(self, fetcher: Fetcher, cache: HTTPCache, offline: bool = False):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.offline = offline
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        entry = self.cache.lookup(url)
+        if entry is not None and self.offline:
+            return Response(url, 200, entry.headers, self.cache.body(entry))
+        if self.offline:
+            raise FetchError(f"{url}: not cached (offline)")
+
+        conditional = entry.conditional_headers() if entry else {}
+        response = self.fetcher.get(url, {**conditional, **(headers or {})})
+        if response.status == 304 and entry is not None:
+            return Response(response.url, 200, entry.headers, self.cache.body(entry))
+        if response.status == 200:
+            self.cache.store(url, response.headers, response.body)
+        return response
+
+    def close(self) -> None:
+        self.fetcher.close()
+
+    def __enter__(self) -> "CachingFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _DivParser(HTMLParser):
+    """Collect the outer HTML of every ``<div>`` with one of ``classes``."""
+
+    def __init__(self, source: str, classes: set[str], links: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.classes = classes
+        self.links = links
+        self.divs: list[tuple[int, str, str]] = []
+        self.hrefs: list[str] = []
+        # getpos() counts "\n" only, unlike str.splitlines()
+        self._offsets = [0] + [m.end() for m in re.finditer("\n", source)]
+        self._open: list[tuple[str, int] | None] = []
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._offsets[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            cls = dict(attrs).get("class") or ""
+            if cls in self.classes:
+                self._open.append((cls, self._offset()))
+            else:
+                self._open.append(None)
+        elif tag == "a" and self.links and any(self._open):
+            href = dict(attrs).get("href")
+            if href:
+                self.hrefs.append(href)
+
+    def handle_endtag(self, tag):
+        if tag != "div" or not self._open:
+            return
+        opened = self._open.pop()
+        if opened:
+            cls, start = opened
+            end = self.source.index(">", self._offset()) + 1
+            self.divs.append((start, cls, self.source[start:end]))
+
+
+def exercise_links(html: str, base_url: str) -> list[str]:
+    """Return the exercise URLs listed in the course page's outline."""
+    parser = _DivParser(html, {"css-1k6or5q"}, links=True)
+    parser.feed(html)
+    parser.close()
+    return [urljoin(base_url, href) for href in parser.hrefs]
+
+
+def exercise_html(html: str) -> str | None:
+    """Return the context and instructions of an exercise, or None."""
+    parser = _DivParser(html, {"listview__content", "exercise--instructions__content"})
+    parser.feed(html)
+    parser.close()
+    # Divs are recorded when they close, so restore document order first
+    divs = sorted(parser.divs)
+    sections = [div for _, cls, div in divs if cls == "listview__content"]
+    if not sections:
+        return None
+    instructions = "".join(
+        div for _, cls, div in divs if cls == "exercise--instructions__content"
+    )
+    return sections[0] + INSTRUCTIONS_HEADING + instructions + SOLUTIONS_HEADING
+
+
+@lru_cache(maxsize=1)
+def code_hash() -> bytes:
+    """Hash of the parser's code, so editing it invalidates parsed pages."""
+    with open(__file__, "rb") as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def scrape(
+    course_url: str = COURSE_URL,
+    fetcher: Fetcher | CachingFetcher | None = None,
+    workers: int = 8,
+    cache: HTTPCache | None = None,
+) -> list[str]:
+    """Scrape every exercise of a course, keeping the course's order.
+
+    With a ``cache``, exercise pages whose body has not changed since a
+    previous run are not parsed again, unless this module has changed since.
+    """
+    owned = fetcher is None
+    fetcher = fetcher or Fetcher()
+    try:
+        course = fetcher.get(course_url)
+        exercises = exercise_links(course.text, course.url)
+
+        def fetch(url: str) -> str | None:
+            response = fetcher.get(url)
+            if cache is None:
+                return exercise_html(response.text)
+            try:
+                return cache.derived("exercise", response.body, code_hash())
+            except KeyError:
+                section = exercise_html(response.text)
+                cache.store_derived("exercise", response.body, section, code_hash())
+                return section
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            output = list(pool.map(fetch, exercises))
+    finally:
+        if owned:
+            fetcher.close()
+    return [section for section in output if section is not None]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("course_url", nargs="?", default=COURSE_URL)
+    parser.add_argument("-o", "--output", default="scrape.html")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--cache", default=CACHE_DIR, help="cache directory")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--offline", action="store_true", help="use cache only")
+    args = parser.parse_args()
+
+    fetcher: Fetcher | CachingFetcher
+    fetcher = Fetcher(per_host=args.per_host, retries=args.retries)
+    cache = None if args.no_cache else HTTPCache(args.cache)
+    if cache is not None:
+        fetcher = CachingFetcher(fetcher, cache, offline=args.offline)
+    with fetcher:
+        output = scrape(args.course_url, fetcher, args.workers, cache)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        file.writelines(section + "\n" for section in output)
+
+
+if __name__ == "__main__":
+    main()
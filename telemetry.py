@@ -0,0 +1,371 @@
+"""Structured metrics for API calls.
+
+Helpers record one dict per call into a sink: ``MemorySink`` keeps them for
+the current process and ``JSONLinesSink`` appends them to a file that
+``python telemetry.py metrics.jsonl`` summarises. ``default_sink`` writes to
+``OPENAI_METRICS`` when it is set.
+
+With ``OPENAI_TELEMETRY`` set, ``TelemetryMiddleware`` records every request
+that reaches the API (tokens, prompt tokens served from the provider's
+prefix cache, latency, retries and estimated cost per model)
+and the totals are written at exit: as Prometheus text to a ``.prom`` path,
+as JSON to a ``.json`` path, or to stderr otherwise.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from typing import Protocol
+
+import httpx
+
+from middleware import Middleware, endpoint, form_field, request_json
+
+
+class Sink(Protocol):
+    def write(self, record: dict) -> None: ...
+
+
+class MemorySink:
+    def __init__(self):
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+
+class JSONLinesSink:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+_default: Sink | None = None
+
+
+def default_sink() -> Sink:
+    global _default
+    if _default is None:
+        path = os.environ.get("OPENAI_METRICS")
+        _default = JSONLinesSink(path) if path else MemorySink()
+    return _default
+
+
+def read_records(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile, ``q`` in [0, 100]."""
+    ordered = sorted(values)
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(records: list[dict]) -> dict[str, dict[str, float]]:
+    """Count, mean and p50/p95 of every numeric field, grouped by kind."""
+    groups: dict[str, list[dict]] = {}
+    for record in records:
+        groups.setdefault(record.get("kind", "call"), []).append(record)
+    summary = {}
+    for kind, group in groups.items():
+        fields = {
+            key
+            for record in group
+            for key, value in record.items()
+            if isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and key != "timestamp"
+        }
+        stats: dict[str, float] = {"count": len(group)}
+        for field in sorted(fields):
+            values = [r[field] for r in group if isinstance(r.get(field), (int, float))]
+            stats[f"{field}_mean"] = statistics.fmean(values)
+            stats[f"{field}_p50"] = percentile(values, 50)
+            stats[f"{field}_p95"] = percentile(values, 95)
+        summary[kind] = stats
+    return summary
+
+
+# US dollars per million prompt and completion tokens, by model prefix
+PRICES = {
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "gpt-3.5-turbo-instruct": (1.5, 2.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.1, 0.0),
+    "text-moderation": (0.0, 0.0),
+    "omni-moderation": (0.0, 0.0),
+}
+# Share of the prompt price charged for tokens read from the prompt cache
+CACHED_PRICE = 0.5
+
+
+def cost(
+    model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0
+) -> float | None:
+    """Estimated price of a call, or ``None`` for models without a price."""
+    prefixes = [prefix for prefix in PRICES if model.startswith(prefix)]
+    if not prefixes:
+        return None
+    prompt_price, completion_price = PRICES[max(prefixes, key=len)]
+    prompt = prompt_tokens - cached_tokens + cached_tokens * CACHED_PRICE
+    return (prompt * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+class Metrics:
+    """Running totals and recent latencies per endpoint and model."""
+
+    def __init__(self, window: int = 10_000):
+        self.window = window
+        self.series: dict[tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, record: dict) -> None:
+        key = (record["endpoint"], record["model"])
+        with self._lock:
+            series = self.series.setdefault(
+                key,
+                {
+                    "requests": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cached_tokens": 0,
+                    "cost": 0.0,
+                    "latency_sum": 0.0,
+                    "latencies": deque(maxlen=self.window),
+                },
+            )
+            series["requests"] += 1
+            series["errors"] += record["status"] >= 400
+            series["retries"] += record["retry"] > 0
+            series["prompt_tokens"] += record.get("prompt_tokens") or 0
+            series["completion_tokens"] += record.get("completion_tokens") or 0
+            series["cached_tokens"] += record.get("cached_tokens") or 0
+            series["cost"] += record.get("cost") or 0.0
+            series["latency_sum"] += record["latency"]
+            series["latencies"].append(record["latency"])
+
+    def as_json(self) -> list[dict]:
+        with self._lock:
+            rows = []
+            for (path, model), series in sorted(self.series.items()):
+                row = {"endpoint": path, "model": model}
+                row.update({k: v for k, v in series.items() if k != "latencies"})
+                for q in (50, 95, 99):
+                    row[f"latency_p{q}"] = percentile(list(series["latencies"]), q)
+                rows.append(row)
+            return rows
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        metrics = [
+            ("openai_requests_total", "counter", "requests", "API requests"),
+            (
+                "openai_errors_total",
+                "counter",
+                "errors",
+                "responses with status >= 400",
+            ),
+            ("openai_retries_total", "counter", "retries", "retried requests"),
+            ("openai_prompt_tokens_total", "counter", "prompt_tokens", "prompt tokens"),
+            (
+                "openai_completion_tokens_total",
+                "counter",
+                "completion_tokens",
+                "completion tokens",
+            ),
+            (
+                "openai_cached_tokens_total",
+                "counter",
+                "cached_tokens",
+                "prompt tokens read from the prompt cache",
+            ),
+            ("openai_cost_dollars_total", "counter", "cost", "estimated cost in USD"),
+        ]
+        rows = self.as_json()
+        for name, kind, field, help in metrics:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for row in rows:
+                labels = f'endpoint="{row["endpoint"]}",model="{row["model"]}"'
+                lines.append(f"{name}{{{labels}}} {row[field]}")
+        name = "openai_request_latency_seconds"
+        lines += [f"# HELP {name} request latency", f"# TYPE {name} summary"]
+        for row in rows:
+            labels = f'endpoint="{row["endpoint"]}",model="{row["model"]}"'
+            for q in (50, 95, 99):
+                value = row[f"latency_p{q}"]
+                lines.append(f'{name}{{{labels},quantile="{q / 100}"}} {value}')
+            lines.append(f"{name}_sum{{{labels}}} {row['latency_sum']}")
+            lines.append(f"{name}_count{{{labels}}} {row['requests']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | None) -> None:
+        """Export to ``path`` (``.prom`` or ``.json``) or print to stderr."""
+        if path and path.endswith(".prom"):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.prometheus())
+        elif path and path.endswith(".json"):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(self.as_json(), file, indent=2)
+        else:
+            for row in self.as_json():
+                hits = row["cached_tokens"] / max(row["prompt_tokens"], 1)
+                print(
+                    f"{row['endpoint']} {row['model']}: {row['requests']} requests, "
+                    f"{row['prompt_tokens']}+{row['completion_tokens']} tokens "
+                    f"({hits:.0%} of prompt tokens cached), "
+                    f"${row['cost']:.4f}, p50 {row['latency_p50']:.3f}s, "
+                    f"p95 {row['latency_p95']:.3f}s, {row['retries']} retries",
+                    file=sys.stderr,
+                )
+
+
+def _prompt(body: dict) -> str:
+    """Short preview of the prompt, to find the calls that dominate spend."""
+    if "messages" in body:
+        users = [m for m in body["messages"] if m.get("role") == "user"]
+        text = str(users[-1].get("content")) if users else ""
+    else:
+        text = str(body.get("prompt") or body.get("input") or "")
+    return " ".join(text.split())[:80]
+
+
+class TelemetryMiddleware(Middleware):
+    """Records one ``api.call`` record per request into ``sink`` and ``metrics``.
+
+    Streamed replies are timed up to their headers and carry no usage;
+    ``chat.stream_response`` records their full timing.
+    """
+
+    def __init__(self, inner, metrics: Metrics, sink: Sink | None = None):
+        super().__init__(inner)
+        self.metrics = metrics
+        self.sink = sink or default_sink()
+
+    def _record(
+        self, request: httpx.Request, response: httpx.Response, start: float
+    ) -> None:
+        body = request_json(request) or {}
+        model = body.get("model")
+        if model is None:
+            # Audio uploads are multipart; reading them again would double I/O
+            model = form_field(request, "model") or "unknown"
+        record = {
+            "kind": "api.call",
+            "endpoint": endpoint(request),
+            "model": model,
+            "timestamp": time.time(),
+            "status": response.status_code,
+            "latency": time.perf_counter() - start,
+            "retry": int(request.headers.get("x-stainless-retry-count", 0)),
+            "prompt": _prompt(body),
+        }
+        if "text/event-stream" not in response.headers.get("content-type", ""):
+            try:
+                usage = response.json().get("usage") or {}
+            except (ValueError, AttributeError):
+                usage = {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+            details = usage.get("prompt_tokens_details") or {}
+            cached_tokens = details.get("cached_tokens") or 0
+            record["prompt_tokens"] = prompt_tokens
+            record["completion_tokens"] = completion_tokens
+            record["cached_tokens"] = cached_tokens
+            record["cost"] = cost(
+                model, prompt_tokens, completion_tokens, cached_tokens
+            )
+        self.metrics.add(record)
+        self.sink.write(record)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        if "text/event-stream" not in response.headers.get("content-type", ""):
+            response.read()
+        self._record(request, response, start)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        if "text/event-stream" not in response.headers.get("content-type", ""):
+            await response.aread()
+        self._record(request, response, start)
+        return response
+
+
+metrics = Metrics()
+
+
+def from_env() -> Metrics | None:
+    """The process-wide ``metrics`` if ``OPENAI_TELEMETRY`` is set."""
+    target = os.environ.get("OPENAI_TELEMETRY")
+    if not target:
+        return None
+    atexit.register(metrics.write, None if target == "1" else target)
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="JSON lines written by JSONLinesSink")
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="write api.call totals as Prometheus text (.prom) or JSON (.json)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="most expensive and slowest prompts"
+    )
+    args = parser.parse_args()
+
+    records = read_records(args.path)
+    for kind, stats in summarize(records).items():
+        print(kind)
+        for name, value in stats.items():
+            print(f"  {name:<28} {value:12.4f}")
+    calls = [r for r in records if r.get("kind") == "api.call"]
+    if args.export:
+        totals = Metrics()
+        for record in calls:
+            totals.add(record)
+        totals.write(args.export)
+    for field in ("cost", "latency"):
+        totals_by_prompt: dict[str, float] = {}
+        for record in calls:
+            key = record.get("prompt", "")
+            totals_by_prompt[key] = totals_by_prompt.get(key, 0) + (
+                record.get(field) or 0
+            )
+        top = sorted(totals_by_prompt.items(), key=lambda item: -item[1])
+        if calls:
+            print(f"top prompts by total {field}")
+            for prompt, total in top[: args.top]:
+                print(f"  {total:12.4f}  {prompt}")
+
+
+if __name__ == "__main__":
+    main()
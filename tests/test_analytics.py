@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import analytics
+
+
+def test_digest_covers_module_code(monkeypatch, tmp_path):
+    data = tmp_path / "reviews.csv"
+    data.write_text("Review ID,Age\n1,30\n", encoding="utf-8")
+    source = tmp_path / "analytics.py"
+    source.write_bytes(Path(analytics.__file__).read_bytes())
+    monkeypatch.setattr(analytics, "__file__", str(source))
+    before = analytics._digest([str(data)])
+    assert analytics._digest([str(data)]) == before
+
+    # Editing anything in the module, such as the age bins, changes the key
+    source.write_text(
+        source.read_text(encoding="utf-8").replace("[0, 24, 34", "[0, 29, 34"),
+        encoding="utf-8",
+    )
+    assert analytics._digest([str(data)]) != before
@@ -0,0 +1,84 @@
+import json
+from functools import partial
+
+import pytest
+from openai import InternalServerError
+
+import batch
+import mock_openai
+from clients import get_client
+
+
+@pytest.fixture
+def base_url():
+    server, url = mock_openai.serve()
+    yield url
+    server.shutdown()
+
+
+def ask(client, prompts: list[str]) -> list[str]:
+    # One call site for the export and import runs alike
+    replies = []
+    for prompt in prompts:
+        try:
+            response = client.completions.create(model="mock", prompt=prompt)
+        except InternalServerError:
+            replies.append(None)
+        else:
+            replies.append(response.choices[0].text)
+    return replies
+
+
+def run_batch(tmp_path, base_url: str, prompts: list[str]):
+    exported = str(tmp_path / "batch.jsonl")
+    results = str(tmp_path / "results.jsonl")
+    client = get_client(
+        api_key="mock",
+        base_url=base_url,
+        middleware=(partial(batch.ExportMiddleware, path=exported),),
+    )
+    placeholders = ask(client, prompts)
+    batch.run_local(get_client(api_key="mock", base_url=base_url), exported, results)
+    return placeholders, exported, results
+
+
+def importing(base_url: str, results: str):
+    client = get_client(
+        api_key="mock",
+        base_url=base_url,
+        middleware=(partial(batch.ImportMiddleware, path=results),),
+    )
+    return client.with_options(max_retries=1)
+
+
+def test_export_run_import(tmp_path, base_url):
+    placeholders, exported, results = run_batch(tmp_path, base_url, ["a", "b", "c"])
+    with open(exported, encoding="utf-8") as file:
+        ids = [json.loads(line)["custom_id"] for line in file]
+    assert len(set(ids)) == 3
+    assert placeholders == [f"<batched {custom_id}>" for custom_id in ids]
+    # Unknown prompts fall through to the server, so any mix-up would show
+    assert ask(importing(base_url, results), ["x", "y", "z"]) == [
+        "Echo: a",
+        "Echo: b",
+        "Echo: c",
+    ]
+
+
+def test_retried_error_keeps_its_custom_id(tmp_path, base_url):
+    _, _, results = run_batch(tmp_path, base_url, ["a", "b", "c"])
+    with open(results, encoding="utf-8") as file:
+        lines = [json.loads(line) for line in file]
+    lines[0]["error"] = {"code": "server_error", "message": "failed"}
+    with open(results, "w", encoding="utf-8") as file:
+        file.writelines(json.dumps(line) + "\n" for line in lines)
+    replies = ask(importing(base_url, results), ["x", "y", "z"])
+    assert replies == [None, "Echo: b", "Echo: c"]
+
+
+def test_async_duplicates_get_distinct_ids():
+    sites = batch.CallSites()
+    body = {"model": "mock", "prompt": "same"}
+    first, second = sites.custom_id(body, True), sites.custom_id(body, True)
+    assert first != second
+    assert sites.custom_id(body, True, retry=True) == second
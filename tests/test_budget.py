@@ -0,0 +1,88 @@
+import pytest
+
+import budget
+from budget import PromptTooLong, count_messages, fit
+
+MODEL = "test-model"  # DEFAULT_LIMITS: a 4096-token window
+WINDOW = budget.DEFAULT_LIMITS[0]
+
+
+@pytest.fixture(autouse=True)
+def four_characters_per_token(monkeypatch):
+    # Count without tiktoken so the numbers do not depend on what is installed
+    monkeypatch.setattr(budget, "encoding", lambda model: None)
+    budget.count.cache_clear()
+    yield
+    budget.count.cache_clear()
+
+
+def words(n: int) -> str:
+    return " ".join(["word"] * n)
+
+
+def chat(*contents: str, **options) -> dict:
+    messages = [{"role": "user", "content": content} for content in contents]
+    return {"model": MODEL, "messages": messages, **options}
+
+
+def test_a_prompt_that_fits_is_left_alone():
+    body = chat("Summarize ```short text```")
+    assert fit(body) == body
+    assert "max_tokens" not in fit(body)
+
+
+def test_the_fenced_text_is_shortened_first():
+    instructions = "Summarize the review in two bullet points: "
+    body = chat(instructions + "```" + words(5000) + "```")
+    fitted = fit(body)
+    content = fitted["messages"][0]["content"]
+    assert content.startswith(instructions + "```word word")
+    assert content.endswith("word```")
+    used = count_messages(fitted["messages"], MODEL)
+    assert used + 256 <= WINDOW
+    # Only a shortened prompt gets max_tokens: the room it left for the reply
+    assert fitted["max_tokens"] == WINDOW - used
+    assert body["messages"][0]["content"].count("word") == 5000
+
+
+def test_without_a_fence_the_longest_message_is_shortened():
+    fitted = fit(chat("Be brief.", words(5000)))
+    assert fitted["messages"][0]["content"] == "Be brief."
+    assert len(fitted["messages"][1]["content"]) < len(words(5000))
+
+
+def test_the_callers_max_tokens_is_reserved_and_kept():
+    fitted = fit(chat("```" + words(3000) + "```", max_tokens=1000))
+    assert fitted["max_tokens"] == 1000
+    assert count_messages(fitted["messages"], MODEL) + 1000 <= WINDOW
+
+
+def test_completions_prompts_are_shortened_too():
+    fitted = fit({"model": MODEL, "prompt": words(5000)})
+    assert budget.count(fitted["prompt"], MODEL) + 256 <= WINDOW
+
+
+def test_reject_mode_raises_instead_of_shortening():
+    with pytest.raises(PromptTooLong, match="exceeds the 4096-token"):
+        fit(chat("```" + words(5000) + "```"), truncate_input=False)
+
+
+def test_a_prompt_that_cannot_fit_raises():
+    # The fenced text is all that may be cut, and it is far too short
+    with pytest.raises(PromptTooLong):
+        fit(chat(words(5000) + " ```short```"))
+
+
+def test_a_cut_that_comes_out_long_is_cut_again(monkeypatch):
+    truncate = budget.truncate
+    calls = []
+
+    def retokenized_longer(text, tokens, model):
+        calls.append(tokens)
+        cut = truncate(text, tokens, model)
+        return cut + " word" * 20 if len(calls) == 1 else cut
+
+    monkeypatch.setattr(budget, "truncate", retokenized_longer)
+    fitted = fit(chat("```" + words(5000) + "```"))
+    assert len(calls) == 2
+    assert count_messages(fitted["messages"], MODEL) + 256 <= WINDOW
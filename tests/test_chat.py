@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import clients
+import mock_openai
+from chat import aget_responses, get_responses, stream_response
+from telemetry import MemorySink
+
+
+@pytest.fixture
+def base_url(monkeypatch):
+    server, url = mock_openai.serve(latency=0.05, distribution="uniform", seed=1)
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.setenv("OPENAI_BASE_URL", url)
+    yield url
+    server.shutdown()
+
+
+def test_get_responses_keeps_input_order(base_url):
+    prompts = [f"prompt {i}" for i in range(20)]
+    replies = get_responses(prompts, concurrency=8, rpm=6000)
+    assert replies == [f"Echo: {prompt}" for prompt in prompts]
+
+
+def test_get_responses_accepts_message_lists(base_url):
+    messages = [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Hello"},
+    ]
+    assert get_responses([messages, "Bye"]) == ["Echo: Hello", "Echo: Bye"]
+
+
+def test_run_closes_the_shared_clients_of_its_loop(base_url):
+    closed = []
+
+    async def track():
+        client = clients.get_async_client()
+        original = client.close
+
+        async def close():
+            closed.append(client)
+            await original()
+
+        client.close = close
+        return await aget_responses(["Hi"])
+
+    assert clients.run(track) == ["Echo: Hi"]
+    assert len(closed) == 1
+    assert not clients._async_clients
+
+
+def test_get_responses_inside_a_running_loop(base_url):
+    async def notebook_cell():
+        return get_responses(["Hi"])
+
+    with pytest.raises(RuntimeError, match="await aget_responses"):
+        asyncio.run(notebook_cell())
+
+
+def test_stream_response_frees_the_connection_when_stopped_early(base_url):
+    client = clients.get_client(
+        api_key="mock", base_url=base_url, max_connections=1, timeout=1
+    ).with_options(max_retries=0)
+    sink = MemorySink()
+    prompt = " ".join(f"word{i}" for i in range(50))
+    for _ in range(3):
+        for piece in stream_response(prompt, client=client, sink=sink):
+            break
+    reply = "".join(stream_response("Hi", client=client, sink=sink))
+    assert reply == "Echo: Hi"
+    assert [record["partial"] for record in sink.records] == [True] * 3 + [False]
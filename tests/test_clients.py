@@ -0,0 +1,12 @@
+import clients
+
+
+def test_shared_clients_follow_the_environment(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:1/v1")
+    first = clients.get_client()
+    assert clients.get_client() is first
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:2/v1")
+    second = clients.get_client()
+    assert second is not first
+    assert str(second.base_url) == "http://127.0.0.1:2/v1/"
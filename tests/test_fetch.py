@@ -0,0 +1,165 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from httpcache import HTTPCache
+from scrape import CachingFetcher, Fetcher, FetchError, exercise_html, scrape
+
+
+class Site:
+    """Routes of the fixture server: path -> handler(request) -> response."""
+
+    def __init__(self):
+        self.routes = {}
+        self.hits: list[str] = []
+        self.ports: list[int] = []
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        site = self.server.site
+        with site.lock:
+            site.hits.append(self.path)
+            site.ports.append(self.client_address[1])
+            site.active += 1
+            site.most_active = max(site.most_active, site.active)
+        try:
+            status, headers, body = site.routes[self.path](self)
+        finally:
+            with site.lock:
+                site.active -= 1
+        self.send_response(status)
+        for name, value in {**headers, "Content-Length": str(len(body))}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.site = Site()
+    server.site.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.site
+    server.shutdown()
+    server.server_close()
+
+
+def page(text: str, **headers) -> tuple[int, dict, bytes]:
+    return 200, {"Content-Type": "text/html; charset=utf-8", **headers}, text.encode()
+
+
+def failing(times: int, status: int = 503, **headers):
+    """A route that answers ``status`` ``times`` times, then a page."""
+    calls = []
+
+    def route(request):
+        calls.append(1)
+        if len(calls) <= times:
+            return status, headers, b""
+        return page("ok")
+
+    return route
+
+
+def test_retries_transient_failures_with_backoff(site):
+    site.routes["/flaky"] = failing(2)
+    with Fetcher(backoff=0.01) as fetcher:
+        assert fetcher.get(site.url + "/flaky").text == "ok"
+    assert site.hits == ["/flaky"] * 3
+
+
+def test_gives_up_after_the_last_retry(site):
+    site.routes["/down"] = failing(10)
+    with Fetcher(retries=2, backoff=0.01) as fetcher:
+        with pytest.raises(FetchError, match="HTTP 503"):
+            fetcher.get(site.url + "/down")
+    assert len(site.hits) == 3
+
+
+def test_waits_as_long_as_retry_after_says(site):
+    site.routes["/limited"] = failing(1, 429, **{"Retry-After": "1"})
+    with Fetcher(backoff=0.01) as fetcher:
+        start = time.monotonic()
+        assert fetcher.get(site.url + "/limited").text == "ok"
+    assert time.monotonic() - start >= 1
+
+
+def test_reuses_keep_alive_connections(site):
+    site.routes["/page"] = lambda request: page("ok")
+    with Fetcher() as fetcher:
+        for _ in range(3):
+            fetcher.get(site.url + "/page")
+    assert len(set(site.ports)) == 1
+
+
+def test_limits_concurrent_requests_per_host(site):
+    def slow(request):
+        time.sleep(0.1)
+        return page("ok")
+
+    site.routes["/slow"] = slow
+    with Fetcher(per_host=2) as fetcher, ThreadPoolExecutor(6) as pool:
+        list(pool.map(lambda _: fetcher.get(site.url + "/slow"), range(6)))
+    assert site.most_active == 2
+
+
+def exercise(number: int) -> str:
+    return (
+        f'<div class="listview__content"><p>Exercise {number}</p></div>'
+        '<div class="exercise--instructions__content"><p>Do it.</p></div>'
+    )
+
+
+def test_scrape_keeps_the_course_order(site):
+    links = "".join(f'<a href="/ex/{n}">{n}</a>' for n in range(1, 6))
+    site.routes["/course"] = lambda r: page(f'<div class="css-1k6or5q">{links}</div>')
+    for n in range(1, 6):
+        # Earlier exercises answer later
+        def route(request, n=n):
+            time.sleep(0.05 * (5 - n))
+            return page(exercise(n))
+
+        site.routes[f"/ex/{n}"] = route
+    with Fetcher() as fetcher:
+        output = scrape(site.url + "/course", fetcher, workers=5)
+    assert output == [exercise_html(exercise(n)) for n in range(1, 6)]
+
+
+def test_caching_fetcher_revalidates_and_works_offline(site, tmp_path):
+    revalidated = []
+
+    def tagged(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            revalidated.append(request.path)
+            return 304, {"ETag": '"v1"'}, b""
+        return page(exercise(1), ETag='"v1"')
+
+    site.routes["/ex/1"] = tagged
+    cache = HTTPCache(str(tmp_path))
+    with CachingFetcher(Fetcher(), cache) as fetcher:
+        first = fetcher.get(site.url + "/ex/1")
+        second = fetcher.get(site.url + "/ex/1")
+    assert first.status == second.status == 200
+    assert second.body == first.body == exercise(1).encode()
+    assert revalidated == ["/ex/1"]
+
+    with CachingFetcher(Fetcher(), cache, offline=True) as offline:
+        assert offline.get(site.url + "/ex/1").body == first.body
+        with pytest.raises(FetchError, match="offline"):
+            offline.get(site.url + "/ex/2")
+    assert len(site.hits) == 2
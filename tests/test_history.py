@@ -0,0 +1,57 @@
+from history import Conversation
+
+
+def words(message: dict) -> int:
+    return len(message["content"].split())
+
+
+def contents(conversation: Conversation) -> list[str]:
+    return [m["content"] for m in conversation.messages]
+
+
+def test_latest_message_kept_over_budget():
+    conversation = Conversation("be brief", budget=5, count_tokens=words)
+    conversation.append("user", "one two")
+    conversation.append("user", "a question that is far longer than the budget")
+    assert contents(conversation) == [
+        "be brief",
+        "a question that is far longer than the budget",
+    ]
+    assert conversation.tokens > conversation.budget
+
+
+def test_exchanges_dropped_together():
+    conversation = Conversation(budget=8, count_tokens=words)
+    for turn in range(6):
+        for role in ("user", "assistant"):
+            conversation.append(role, f"{role[0]}{turn} {role[0]}{turn}")
+            # Each question is dropped with its reply, never before it
+            assert conversation.messages[0]["role"] == "user"
+            assert conversation.tokens <= conversation.budget
+    assert contents(conversation) == ["u4 u4", "a4 a4", "u5 u5", "a5 a5"]
+
+
+def test_summary_rechecked_against_budget():
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append((summary, [m["content"] for m in messages]))
+        return "x y z"
+
+    conversation = Conversation(budget=12, summarize=summarize, count_tokens=words)
+    for turn in range(1, 4):
+        conversation.append("user", f"q{turn} q{turn}")
+        conversation.append("assistant", f"a{turn} a{turn}")
+    assert not calls
+    conversation.append("user", "q4 q4")
+
+    # Dropping one exchange fits the budget, until the summary is added
+    assert calls == [
+        (None, ["q1 q1", "a1 a1"]),
+        ("x y z", ["q2 q2", "a2 a2", "q3 q3", "a3 a3"]),
+    ]
+    assert contents(conversation) == [
+        "Summary of the earlier conversation: x y z",
+        "q4 q4",
+    ]
+    assert conversation.tokens <= conversation.budget
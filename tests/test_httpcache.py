@@ -0,0 +1,11 @@
+import pytest
+
+from httpcache import HTTPCache
+
+
+def test_derived_values_are_keyed_by_code_version(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store_derived("exercise", b"<html>", "old section", b"parser v1")
+    assert cache.derived("exercise", b"<html>", b"parser v1") == "old section"
+    with pytest.raises(KeyError):
+        cache.derived("exercise", b"<html>", b"parser v2")
@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from openai import OpenAI, RateLimitError
+
+import mock_openai
+import scheduler
+
+
+def client_for(base_url: str, middleware=None) -> OpenAI:
+    transport = httpx.HTTPTransport()
+    if middleware is not None:
+        transport = middleware(transport)
+    return OpenAI(
+        api_key="mock",
+        base_url=base_url,
+        max_retries=0,
+        http_client=httpx.Client(transport=transport),
+    )
+
+
+def ask(client: OpenAI, i: int) -> str:
+    response = client.chat.completions.create(
+        model="mock", messages=[{"role": "user", "content": f"Prompt {i}"}]
+    )
+    return response.choices[0].message.content
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("6m0s", 360.0),
+        ("1.5s", 1.5),
+        ("20ms", 0.02),
+        ("1h2m3s", 3723.0),
+        ("2m30.5s", 150.5),
+        ("", None),
+        ("soon", None),
+    ],
+)
+def test_parse_duration(value, seconds):
+    assert scheduler.parse_duration(value) == seconds
+
+
+def test_no_429_reaches_the_caller():
+    server, base_url = mock_openai.serve(rpm=10, window=1)
+    try:
+        with ThreadPoolExecutor(10) as pool:
+            plain = client_for(base_url)
+            with pytest.raises(RateLimitError):
+                list(pool.map(lambda i: ask(plain, i), range(30)))
+            time.sleep(1)
+            client = client_for(base_url, scheduler.SchedulerMiddleware)
+            replies = list(pool.map(lambda i: ask(client, i), range(30)))
+    finally:
+        server.shutdown()
+    assert replies == [f"Echo: Prompt {i}" for i in range(30)]
+
+
+def test_429_halves_the_concurrency_once_per_pause():
+    schedule = scheduler.ModelSchedule(initial=8, maximum=64)
+    rejected = httpx.Response(429, headers={"retry-after-ms": "50"})
+    schedule.in_flight = 3
+    with schedule.lock:
+        schedule.release(rejected)
+        schedule.release(rejected)
+    assert schedule.limit == 4
+    assert schedule.paused_until > time.monotonic()
+    time.sleep(0.06)
+    with schedule.lock:
+        schedule.release(httpx.Response(200))
+    assert schedule.limit == 4.25
+
+
+def test_interactive_requests_go_before_batch_requests():
+    server, base_url = mock_openai.serve(latency=0.05)
+    finished = []
+    lock = threading.Lock()
+    client = client_for(
+        base_url, lambda inner: scheduler.SchedulerMiddleware(inner, 1, 1)
+    )
+
+    def call(i: int, priority: str) -> None:
+        if priority == "batch":
+            with scheduler.batch():
+                ask(client, i)
+        else:
+            ask(client, i)
+        with lock:
+            finished.append(priority)
+
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            batch = [pool.submit(call, i, "batch") for i in range(6)]
+            time.sleep(0.08)
+            interactive = pool.submit(call, 6, "interactive")
+            for future in batch + [interactive]:
+                future.result()
+    finally:
+        server.shutdown()
+    # One slot: the batch request in flight finishes, then the interactive one
+    assert finished.index("interactive") <= 2
@@ -0,0 +1,112 @@
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+import clients
+import mock_openai
+from dispatch import FunctionRegistry, adispatch
+from schemas import ArgumentError, record_class
+
+STUDENT = {
+    "name": "extract_student_info",
+    "description": "Get the student information from the body of the input text",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "grades": {"type": "integer"},
+            "students": {"type": "integer"},
+            "enrolled": {"type": "boolean"},
+            "level": {"type": "string", "enum": ["graduate", "undergraduate"]},
+        },
+        "required": ["name", "grades"],
+    },
+}
+Student = record_class(STUDENT)
+
+
+@pytest.mark.parametrize(
+    "arguments, field, expected",
+    [
+        ({"grades": "3.8 GPA"}, "grades", 3.8),
+        ({"grades": 4.0}, "grades", 4),
+        ({"grades": 3}, "grades", 3),
+        ({"students": "17,000 students"}, "students", 17000),
+        ({"enrolled": "yes"}, "enrolled", True),
+        ({"enrolled": "False"}, "enrolled", False),
+        ({"enrolled": True}, "enrolled", True),
+        ({"level": "graduate"}, "level", "graduate"),
+        ({"name": 42}, "name", "42"),
+        ({}, "students", None),
+    ],
+)
+def test_coercion(arguments, field, expected):
+    record = Student.decode({"name": "Ravi", "grades": 3.5, **arguments})
+    value = getattr(record, field)
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+@pytest.mark.parametrize(
+    "arguments, message",
+    [
+        ({"grades": "excellent"}, "grades: expected a number"),
+        ({"grades": True}, "grades: expected a number"),
+        ({"enrolled": "maybe"}, "enrolled: expected a boolean"),
+        ({"level": "postdoc"}, "level: 'postdoc' is not one of"),
+        ({"name": None}, "missing name"),
+        ({"name": {"first": "Ravi"}}, "name: expected a string"),
+    ],
+)
+def test_rejected(arguments, message):
+    with pytest.raises(ArgumentError, match=message):
+        Student.decode({"name": "Ravi", "grades": 3.5, **arguments})
+
+
+def test_missing_and_invalid_json():
+    with pytest.raises(ArgumentError, match="missing grades"):
+        Student.decode('{"name": "Ravi"}')
+    with pytest.raises(ArgumentError, match="invalid JSON"):
+        Student.decode('{"name": "Ravi",')
+    with pytest.raises(ArgumentError, match="expected an object"):
+        Student.decode("[1, 2]")
+
+
+def malformed_first(requests: list[dict]) -> httpx.MockTransport:
+    # Mock replies, with the first function call's grades made unreadable
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        requests.append(body)
+        payload = mock_openai.chat_completion(body)
+        call = payload["choices"][0]["message"]["function_call"]
+        if len(requests) == 1:
+            call["arguments"] = json.dumps({"name": "Ravi", "grades": [3.8]})
+        return httpx.Response(200, json=payload)
+
+    return httpx.MockTransport(handle)
+
+
+def test_dispatch_repairs_malformed_arguments():
+    requests = []
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://mock/v1",
+        http_client=httpx.AsyncClient(transport=malformed_first(requests)),
+    )
+    registry = FunctionRegistry([STUDENT], {STUDENT["name"]: lambda **kw: kw})
+    sample = "Ravi has a 3.8 GPA at a school of 17000 students"
+
+    [result] = clients.run(adispatch, [sample], registry, client=client)
+    assert result["name"] == "mock name"
+    assert result["grades"] == 3.8
+    assert len(requests) == 2
+    repair = requests[1]
+    assert repair["function_call"] == {"name": STUDENT["name"]}
+    assert "grades: expected a number" in repair["messages"][0]["content"]
+
+    requests.clear()
+    with pytest.raises(ArgumentError, match="grades"):
+        clients.run(adispatch, [sample], registry, client=client, repair=False)
+    assert len(requests) == 1
@@ -0,0 +1,36 @@
+import os
+
+from scrape import (
+    INSTRUCTIONS_HEADING,
+    SOLUTIONS_HEADING,
+    exercise_html,
+    exercise_links,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "exercise.html")
+
+
+def read_fixture() -> str:
+    # newline="" keeps the lone "\r" in the title, as a fetched page would
+    with open(FIXTURE, encoding="utf-8", newline="") as file:
+        return file.read()
+
+
+def test_exercise_html_with_line_separators_before_the_divs():
+    html = read_fixture()
+    assert "\u2028" in html and "\r" in html
+    assert exercise_html(html) == (
+        '<div class="listview__content">\n<h1>Find and replace</h1>\n'
+        "<p>Use a <code>prompt</code> to replace text.</p>\n</div>"
+        + INSTRUCTIONS_HEADING
+        + '<div class="exercise--instructions__content">'
+        "<ul><li>Create a request.</li></ul></div>" + SOLUTIONS_HEADING
+    )
+
+
+def test_exercise_links_are_absolute():
+    links = exercise_links(read_fixture(), "https://www.datacamp.com/courses/x/")
+    assert links == [
+        "https://www.datacamp.com/courses/x/exercise-1",
+        "https://www.datacamp.com/courses/x/exercise-2",
+    ]
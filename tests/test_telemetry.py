@@ -0,0 +1,38 @@
+from functools import partial
+
+import httpx
+
+import mock_openai
+from clients import get_client
+from middleware import form_field
+from telemetry import MemorySink, Metrics, TelemetryMiddleware
+
+
+def test_form_field_reads_the_field_list_not_the_body():
+    request = httpx.Request(
+        "POST",
+        "http://mock/v1/audio/transcriptions",
+        data={"model": "whisper-1"},
+        files={"file": ("a.wav", b"\0" * 1024)},
+    )
+    assert form_field(request, "model") == "whisper-1"
+    assert form_field(request, "file") is None
+    assert form_field(httpx.Request("GET", "http://mock/"), "model") is None
+
+
+def test_audio_calls_are_recorded_with_their_model():
+    server, base_url = mock_openai.serve()
+    sink = MemorySink()
+    layer = partial(TelemetryMiddleware, metrics=Metrics(), sink=sink)
+    client = get_client(api_key="mock", base_url=base_url, middleware=(layer,))
+    try:
+        client.audio.transcriptions.create(
+            model="whisper-1", file=("a.wav", b"\0" * 1024)
+        )
+    finally:
+        server.shutdown()
+    [record] = sink.records
+    assert (record["endpoint"], record["model"]) == (
+        "/audio/transcriptions",
+        "whisper-1",
+    )
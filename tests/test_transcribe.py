@@ -0,0 +1,31 @@
+import wave
+
+import pytest
+
+from transcribe import chunks
+
+
+def write_wav(path, seconds: float, rate: int = 44100, channels: int = 2) -> str:
+    with wave.open(str(path), "wb") as audio:
+        audio.setparams((channels, 2, rate, 0, "NONE", "not compressed"))
+        audio.writeframes(b"\0\0" * channels * int(rate * seconds))
+    return str(path)
+
+
+def test_short_small_recordings_are_sent_whole(tmp_path):
+    assert chunks(write_wav(tmp_path / "short.wav", 2), chunk_seconds=10) is None
+
+
+def test_chunks_stay_under_the_upload_limit(tmp_path):
+    # 44.1 kHz stereo is about 176 kB a second, so 1 MB holds under 6 s
+    path = write_wav(tmp_path / "long.wav", 20)
+    parts = list(chunks(path, chunk_seconds=600, overlap=1, max_bytes=1_000_000))
+    assert len(parts) == 5
+    assert all(len(part.data) <= 1_000_000 for part in parts)
+    assert parts[1].start == pytest.approx(parts[0].start + 4.66, abs=0.01)
+
+
+@pytest.mark.parametrize("overlap", [5, 6, -1])
+def test_overlap_must_be_shorter_than_a_chunk(tmp_path, overlap):
+    with pytest.raises(ValueError):
+        chunks(write_wav(tmp_path / "long.wav", 12), chunk_seconds=5, overlap=overlap)
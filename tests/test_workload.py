@@ -0,0 +1,20 @@
+import json
+import sys
+
+import workload
+
+
+def test_main_writes_stdout_without_closing_it(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["workload"])
+    workload.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines and all(json.loads(line)["source"] for line in lines)
+    assert not sys.stdout.closed
+
+
+def test_main_writes_utf8_file(monkeypatch, tmp_path):
+    output = tmp_path / "workload.jsonl"
+    monkeypatch.setattr(sys, "argv", ["workload", "-o", str(output)])
+    workload.main()
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == len(workload.load())
@@ -0,0 +1,341 @@
+"""Transcribe long recordings in overlapping chunks, concurrently.
+
+``transcribe(path)`` replaces::
+
+    audio_file = open("datacamp-q2-roadmap.mp3", "rb")
+    response = client.audio.transcriptions.create(model="whisper-1", file=audio_file)
+    print(response.text)
+
+Recordings longer than ``chunk_seconds``, or too large to upload at once,
+are split into chunks that overlap by ``overlap`` seconds, so no word is cut
+in half without also appearing whole in the next chunk. The chunks are uploaded concurrently and their
+transcripts stitched back together, dropping the words repeated in the
+overlap. Only the chunks being uploaded are held in memory. WAV files are
+split with the standard library; other formats need ``ffmpeg``.
+
+``ask(path, "List the courses DataCamp will be making as bullet points.")``
+chains transcription and chat: each chunk is summarised while the next ones
+are still being transcribed, and a final call answers from the summaries.
+"""
+
+import argparse
+import io
+import os
+import re
+import shutil
+import subprocess
+import wave
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from openai import OpenAI
+
+import chat
+from clients import get_client
+
+MODEL = "whisper-1"
+# The transcription endpoints reject larger uploads
+MAX_UPLOAD_BYTES = 25 * 1000 * 1000
+
+PART_PROMPT = (
+    "Summarise this part of a recording's transcript in a few sentences, "
+    "keeping every detail needed for the task: {instruction}\n\n{text}"
+)
+REDUCE_PROMPT = "{instruction}\nThe recording, summarised part by part:\n\n{parts}"
+
+
+@dataclass
+class Chunk:
+    index: int
+    start: float
+    name: str
+    data: bytes
+
+
+def duration(path: str) -> float | None:
+    """Length of the recording in seconds, or ``None`` if it cannot be read."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path) as audio:
+            return audio.getnframes() / audio.getframerate()
+    if shutil.which("ffprobe"):
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration"]
+            + ["-of", "csv=p=0", path],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return float(result.stdout)
+    return None
+
+
+def _chunk_byte_rate(path: str, total: float) -> float:
+    """Bytes per second of the chunks ``path`` is split into."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path) as audio:
+            return audio.getframerate() * audio.getnchannels() * audio.getsampwidth()
+    # ffmpeg encodes MP3 at 128 kbit/s unless the source is denser
+    return max(os.path.getsize(path) / max(total, 1e-9), 128_000 / 8)
+
+
+def _windows(total: float, chunk_seconds: float, overlap: float):
+    start = 0.0
+    while True:
+        yield start, min(chunk_seconds, total - start)
+        if start + chunk_seconds >= total:
+            return
+        start += chunk_seconds - overlap
+
+
+def split_wav(path: str, chunk_seconds: float, overlap: float) -> Iterator[Chunk]:
+    """Overlapping WAV chunks, read from disk one at a time."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with wave.open(path) as audio:
+        rate = audio.getframerate()
+        total = audio.getnframes() / rate
+        for index, (start, length) in enumerate(
+            _windows(total, chunk_seconds, overlap)
+        ):
+            audio.setpos(int(start * rate))
+            frames = audio.readframes(int(length * rate))
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as chunk:
+                chunk.setparams(audio.getparams())
+                chunk.writeframes(frames)
+            yield Chunk(index, start, f"{stem}-{index:03d}.wav", buffer.getvalue())
+
+
+def split_ffmpeg(path: str, chunk_seconds: float, overlap: float) -> Iterator[Chunk]:
+    """Overlapping MP3 chunks cut by ``ffmpeg``, one at a time."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for index, (start, length) in enumerate(
+        _windows(duration(path), chunk_seconds, overlap)
+    ):
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-ss", str(start), "-t", str(length)]
+            + ["-i", path, "-vn", "-f", "mp3", "-"],
+            capture_output=True,
+            check=True,
+        )
+        yield Chunk(index, start, f"{stem}-{index:03d}.mp3", result.stdout)
+
+
+def chunks(
+    path: str,
+    chunk_seconds: float = 600,
+    overlap: float = 2.0,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> Iterator[Chunk] | None:
+    """The chunks of ``path``, or ``None`` to send it whole.
+
+    Chunks last ``chunk_seconds``, or less if that much audio would take more
+    than ``max_bytes`` (uncompressed WAV passes 25 MB in under 5 minutes).
+    Recordings are sent whole when they are short and small enough or when
+    they cannot be split here (not WAV and no ``ffmpeg``).
+    """
+    if not 0 <= overlap < chunk_seconds:
+        # Windows would not advance, and the split would never end
+        raise ValueError("overlap must be at least 0 and less than chunk_seconds")
+    total = duration(path)
+    if total is None:
+        return None
+    if total <= chunk_seconds and os.path.getsize(path) <= max_bytes:
+        return None
+    # Leave room for each chunk's own header
+    fits = (max_bytes - 1024) / _chunk_byte_rate(path, total)
+    chunk_seconds = min(chunk_seconds, fits)
+    if overlap >= chunk_seconds:
+        raise ValueError(f"overlap must be less than {chunk_seconds:.1f}s here")
+    if path.lower().endswith(".wav"):
+        return split_wav(path, chunk_seconds, overlap)
+    if shutil.which("ffmpeg"):
+        return split_ffmpeg(path, chunk_seconds, overlap)
+    return None
+
+
+def _words(text: str) -> list[str]:
+    return re.sub(r"[^\w\s']", "", text.lower()).split()
+
+
+class Stitcher:
+    """Joins chunk transcripts, dropping the words repeated in each overlap.
+
+    The overlap is the longest run of words at the end of the previous
+    transcript that reappears within the first few words of the next one;
+    transcripts are compared ignoring case and punctuation.
+    """
+
+    def __init__(self, window: int = 30):
+        self.window = window
+        self.words: list[str] = []
+
+    def add(self, text: str) -> str:
+        """Append a chunk transcript and return its new, non-overlapping part."""
+        words = text.split()
+        tail = _words(" ".join(self.words[-self.window :]))
+        head = [_words(word) for word in words[: self.window + 3]]
+        head = [w[0] if w else "" for w in head]
+        skip = 0
+        for size in range(min(len(tail), self.window), 0, -1):
+            # The first word or two of a chunk may be a cut-off fragment
+            for offset in range(3):
+                if head[offset : offset + size] == tail[-size:]:
+                    skip = offset + size
+                    break
+            if skip:
+                break
+        self.words.extend(words[skip:])
+        return " ".join(words[skip:])
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+
+def stitch(texts: Iterable[str], window: int = 30) -> str:
+    stitcher = Stitcher(window)
+    for text in texts:
+        stitcher.add(text)
+    return stitcher.text
+
+
+def transcribe_chunks(
+    path: str,
+    client: OpenAI | None = None,
+    model: str = MODEL,
+    chunk_seconds: float = 600,
+    overlap: float = 2.0,
+    concurrency: int = 4,
+    translate: bool = False,
+    **kwargs,
+) -> Iterator[str]:
+    """Transcript of each chunk, in order, as soon as the chunk is done.
+
+    Extra keyword arguments, such as ``prompt``, go to the API call.
+    """
+    client = client or get_client()
+    audio = client.audio.translations if translate else client.audio.transcriptions
+    parts = chunks(path, chunk_seconds, overlap)
+    if parts is None:
+        # Short recording: stream the file itself and close it afterwards
+        with open(path, "rb") as file:
+            yield audio.create(model=model, file=file, **kwargs).text
+        return
+
+    def upload(chunk: Chunk) -> str:
+        return audio.create(model=model, file=(chunk.name, chunk.data), **kwargs).text
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending: deque[Future] = deque()
+        # Cut the next chunk only when a slot frees, bounding memory
+        for chunk in parts:
+            if len(pending) >= concurrency:
+                yield pending.popleft().result()
+            pending.append(pool.submit(upload, chunk))
+        while pending:
+            yield pending.popleft().result()
+
+
+def transcribe(path: str, **kwargs) -> str:
+    """Full transcript of ``path``; takes the arguments of ``transcribe_chunks``."""
+    return stitch(transcribe_chunks(path, **kwargs))
+
+
+def _complete(
+    client: OpenAI, model: str, prompt: str, max_tokens: int | None = None
+) -> str:
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt},
+        ],
+        max_tokens=max_tokens,
+    )
+    return response.choices[0].message.content
+
+
+def ask(
+    path: str,
+    instruction: str,
+    client: OpenAI | None = None,
+    model: str = chat.MODEL,
+    max_tokens: int | None = None,
+    transcription_model: str = MODEL,
+    chunk_seconds: float = 600,
+    overlap: float = 2.0,
+    concurrency: int = 4,
+    **kwargs,
+) -> str:
+    """Answer ``instruction`` about the recording at ``path``.
+
+    Short recordings are transcribed and sent with the instruction in one
+    call. Longer ones are summarised chunk by chunk as their transcripts
+    arrive, then the summaries are merged by a final call. Other keyword
+    arguments go to ``transcribe_chunks``.
+    """
+    client = client or get_client()
+    texts = transcribe_chunks(
+        path,
+        client,
+        transcription_model,
+        chunk_seconds,
+        overlap,
+        concurrency,
+        **kwargs,
+    )
+    if chunks(path, chunk_seconds, overlap) is None:
+        prompt = f"{instruction} {stitch(texts)}"
+        return _complete(client, model, prompt, max_tokens)
+    stitcher = Stitcher()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        summaries = [
+            pool.submit(
+                _complete,
+                client,
+                model,
+                PART_PROMPT.format(instruction=instruction, text=stitcher.add(text)),
+            )
+            for text in texts
+        ]
+        parts = "\n\n".join(
+            f"Part {i}: {summary.result()}" for i, summary in enumerate(summaries, 1)
+        )
+    prompt = REDUCE_PROMPT.format(instruction=instruction, parts=parts)
+    return _complete(client, model, prompt, max_tokens)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="audio file")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--chunk-seconds", type=float, default=600)
+    parser.add_argument("--overlap", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--translate", action="store_true", help="into English")
+    parser.add_argument("--prompt")
+    parser.add_argument(
+        "--ask", metavar="INSTRUCTION", help="answer this about the recording"
+    )
+    args = parser.parse_args()
+    if not 0 <= args.overlap < args.chunk_seconds:
+        parser.error("--overlap must be at least 0 and less than --chunk-seconds")
+
+    kwargs = {
+        "chunk_seconds": args.chunk_seconds,
+        "overlap": args.overlap,
+        "concurrency": args.concurrency,
+        "translate": args.translate,
+    }
+    if args.prompt:
+        kwargs["prompt"] = args.prompt
+    if args.ask:
+        print(ask(args.path, args.ask, transcription_model=args.model, **kwargs))
+    else:
+        print(transcribe(args.path, model=args.model, **kwargs))
+
+
+if __name__ == "__main__":
+    main()
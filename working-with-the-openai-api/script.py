@@ -1,8 +1,12 @@
 # Import the OpenAI client
-from openai import OpenAI
+import sys
+
+# clients.py is in the repository root, one folder up
+sys.path.append("..")
+from clients import get_client
 
 # Create the OpenAI client and set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to the Completions endpoint
 response = client.completions.create(
@@ -23,7 +27,7 @@ print(response.usage.total_tokens)
 print(response.choices[0].text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 prompt="""Replace car with plane and adjust phrase:
 A car is a vehicle that is typically powered by an internal combustion engine or an electric motor. It has four wheels, and is designed to carry passengers and/or cargo on roads or highways. Cars have become a ubiquitous part of modern society, and are used for a wide variety of purposes, such as commuting, travel, and transportation of goods. Cars are often associated with freedom, independence, and mobility."""
@@ -39,7 +43,7 @@ response = client.completions.create(
 print(response.choices[0].text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 prompt="""Summarize the following text into two concise bullet points:
 Investment refers to the act of committing money or capital to an enterprise with the expectation of obtaining an added income or profit in return. There are a variety of investment options available, including stocks, bonds, mutual funds, real estate, precious metals, and currencies. Making an investment decision requires careful analysis, assessment of risk, and evaluation of potential rewards. Good investments have the ability to produce high returns over the long term while minimizing risk. Diversification of investment portfolios reduces risk exposure. Investment can be a valuable tool for building wealth, generating income, and achieving financial security. It is important to be diligent and informed when investing to avoid losses."""
@@ -55,7 +59,7 @@ response = client.completions.create(
 print(response.choices[0].text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to the Completions endpoint
 response = client.completions.create(
@@ -67,7 +71,7 @@ response = client.completions.create(
 print(response.choices[0].text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to the Completions endpoint
 response = client.completions.create(
@@ -84,7 +88,7 @@ response = client.completions.create(
 print(response.choices[0].text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to the Completions endpoint
 response = client.completions.create(
@@ -97,7 +101,7 @@ response = client.completions.create(
 print(response.choices[0].text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to the Chat Completions endpoint
 response = client.chat.completions.create(
@@ -115,7 +119,7 @@ response = client.chat.completions.create(
 print(response.choices[0].message.content)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 instruction = """Explain what this Python code does in one sentence:
 import numpy as np
@@ -138,7 +142,7 @@ response = client.chat.completions.create(
 print(response.choices[0].message.content)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 response = client.chat.completions.create(
    model="gpt-3.5-turbo",
@@ -154,7 +158,7 @@ response = client.chat.completions.create(
 print(response.choices[0].message.content)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 messages = [{"role": "system", "content": "You are a helpful math tutor."}]
 user_msgs = ["Explain what pi is.", "Summarize this in two bullet points."]
@@ -179,7 +183,7 @@ for q in user_msgs:
     print("Assistant: ", response.choices[0].message.content, "\n")
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Create a request to the Moderation endpoint
 response = client.moderations.create(
@@ -190,7 +194,7 @@ response = client.moderations.create(
 print(response.results[0].category_scores)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Open the openai-audio.mp3 file
 audio_file = open("openai-audio.mp3", "rb")
@@ -202,7 +206,7 @@ response = client.audio.transcriptions.create(model="whisper-1", file=audio_file
 print(response.text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Open the audio.m4a file
 audio_file= open("audio.m4a", "rb")
@@ -213,7 +217,7 @@ response = client.audio.transcriptions.create(model="whisper-1", file=audio_file
 print(response.text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Open the audio.m4a file
 audio_file = open("audio.m4a", "rb")
@@ -225,7 +229,7 @@ response = client.audio.translations.create(model="whisper-1", file=audio_file)
 print(response.text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Open the audio.wav file
 audio_file = open("audio.wav", "rb")
@@ -241,7 +245,7 @@ response = client.audio.translations.create(model="whisper-1",
 print(response.text)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Open the audio.wav file
 audio_file = open("audio.wav", "rb")
@@ -260,7 +264,7 @@ chat_response = client.chat.completions.create(
 print(chat_response.choices[0].message.content)
 
 # Set your API key
-client = OpenAI(api_key="<OPENAI_API_TOKEN>")
+client = get_client(api_key="<OPENAI_API_TOKEN>")
 
 # Open the datacamp-q2-roadmap.mp3 file
 audio_file = open("datacamp-q2-roadmap.mp3", "rb")
@@ -0,0 +1,369 @@
+"""The API calls the course scripts make, as a replayable workload.
+
+``extract(path)`` reads a script without running it (the scraped scripts
+are not all valid Python) and returns one request per call the script would
+make, in order: the endpoint, the request body with its prompt resolved
+from the variables, helper functions and ``for`` loops around the call, and
+the prompt's size in tokens. Names that cannot be resolved statically are
+kept as ``<name>`` placeholders, and list mutations such as
+``messages.append`` are not followed.
+
+``` sh
+python workload.py -o workload.jsonl
+```
+"""
+
+import argparse
+import ast
+import bisect
+import json
+import os
+import re
+import sys
+from collections.abc import Iterator
+
+import budget
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = tuple(
+    os.path.join(_HERE, folder, "script.py")
+    for folder in (
+        "working-with-the-openai-api",
+        "chatgpt-prompt-engineering-for-developers",
+        "open-ai-function-calling-tutorial",
+    )
+)
+
+_CALL = re.compile(
+    r"\.(chat\.completions|completions|moderations|audio\.transcriptions"
+    r"|audio\.translations)\.create\("
+)
+_HEADER = re.compile(r"(def|for)\b.*:\s*(#.*)?$")
+_DEF = re.compile(r"^([ \t]*)def (\w+)\(", re.MULTILINE)
+_OPEN = re.compile(r"""open\((['"])(.+?)\1""")
+
+
+def _skip_string(source: str, i: int) -> int:
+    """Index just past the string literal starting at ``i``."""
+    quote = source[i]
+    if source.startswith(quote * 3, i):
+        end = source.find(quote * 3, i + 3)
+        return len(source) if end < 0 else end + 3
+    i += 1
+    while i < len(source) and source[i] not in (quote, "\n"):
+        i += 2 if source[i] == "\\" else 1
+    return i + 1
+
+
+def _expression_end(source: str, i: int, closing: bool = False) -> int:
+    """End of the expression at ``i``: its newline, or its ``)`` if ``closing``."""
+    depth = 0
+    while i < len(source):
+        char = source[i]
+        if char in "'\"":
+            i = _skip_string(source, i)
+            continue
+        if char == "#":
+            i = source.find("\n", i)
+            i = len(source) if i < 0 else i
+            continue
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+            if depth < 0:
+                return i
+        elif char == "\n" and depth == 0 and not closing:
+            return i
+        i += 1
+    return len(source)
+
+
+def _parse(text: str) -> ast.expr | None:
+    try:
+        return ast.parse(text.strip(), mode="eval").body
+    except SyntaxError:
+        return None
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+class Script:
+    """Statically evaluates the expressions of one script."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, encoding="utf-8") as file:
+            self.source = file.read()
+        self.starts = [0] + [m.end() for m in re.finditer("\n", self.source)]
+
+    def line(self, position: int) -> int:
+        return bisect.bisect_right(self.starts, position)
+
+    def headers(self, position: int) -> list[tuple[int, str]]:
+        """The ``def`` and ``for`` headers around ``position``, innermost first."""
+        lines = self.source.splitlines()
+        number = self.line(position) - 1
+        level = _indent(lines[number])
+        found = []
+        for index in range(number - 1, -1, -1):
+            text = lines[index]
+            if not text.strip() or text.lstrip().startswith("#"):
+                continue
+            if _indent(text) < level:
+                level = _indent(text)
+                if _HEADER.match(text.strip()):
+                    found.append((self.starts[index], text.strip()))
+                if level == 0:
+                    break
+        return found
+
+    def assignment(self, name: str, position: int) -> tuple[int, ast.expr] | None:
+        """The last expression assigned to ``name`` before ``position``."""
+        pattern = re.compile(rf"^[ \t]*{re.escape(name)}[ \t]*=(?!=)", re.MULTILINE)
+        matches = [m for m in pattern.finditer(self.source, 0, position)]
+        for match in reversed(matches):
+            end = _expression_end(self.source, match.end())
+            node = _parse(self.source[match.end() : end])
+            if node is not None:
+                return match.start(), node
+        return None
+
+    def value(self, node: ast.expr, position: int, env: dict, depth: int = 0):
+        """Best static value of ``node`` as seen from ``position``."""
+        if depth > 20:
+            return f"<{ast.unparse(node)}>"
+        recurse = lambda child: self.value(child, position, env, depth + 1)
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.JoinedStr):
+            return "".join(
+                str(
+                    recurse(
+                        part.value if isinstance(part, ast.FormattedValue) else part
+                    )
+                )
+                for part in node.values
+            )
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return [recurse(element) for element in node.elts]
+        if isinstance(node, ast.Dict):
+            return {recurse(k): recurse(v) for k, v in zip(node.keys, node.values)}
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, right = recurse(node.left), recurse(node.right)
+            if type(left) is type(right):
+                return left + right
+        if isinstance(node, ast.Name):
+            if node.id in env:
+                return env[node.id]
+            found = self.assignment(node.id, position)
+            if found is not None:
+                start, expression = found
+                return self.value(expression, start, env, depth + 1)
+        return f"<{ast.unparse(node)}>"
+
+    def loops(self, headers: list[tuple[int, str]], env: dict) -> Iterator[dict]:
+        """Variable bindings for each iteration of the ``for`` loops in ``headers``."""
+        if not headers:
+            yield env
+            return
+        position, text = headers[-1]
+        try:
+            loop = ast.parse(text.split("#")[0].rstrip() + " pass").body[0]
+        except SyntaxError:
+            loop = None
+        if not isinstance(loop, ast.For):
+            yield from self.loops(headers[:-1], env)
+            return
+        items = loop.iter
+        wrapper = items.func.id if _is_call(items, "enumerate", "range") else None
+        if wrapper:
+            items = items.args[0]
+        values = self.value(items, position, env)
+        if wrapper == "range" and isinstance(values, int):
+            values = range(values)
+        elif wrapper == "enumerate" and isinstance(values, list):
+            values = list(enumerate(values))
+        if not isinstance(values, (list, range)):
+            # Unknown sequence: count the call once
+            values = [f"<{ast.unparse(loop.target)}>"]
+        for item in values:
+            yield from self.loops(headers[:-1], {**env, **_bind(loop.target, item)})
+
+    def sites(self, name: str, definition: int) -> Iterator[tuple[int, ast.Call]]:
+        """Calls to the function ``name`` defined at ``definition``."""
+        following = [
+            m.start()
+            for m in _DEF.finditer(self.source, definition + 1)
+            if m[2] == name
+        ]
+        end = following[0] if following else len(self.source)
+        for match in re.finditer(rf"(?<![\w.]){name}\(", self.source[:end]):
+            if match.start() <= definition or self.source.endswith(
+                "def ", 0, match.start()
+            ):
+                continue
+            close = _expression_end(self.source, match.end(), closing=True)
+            node = _parse(self.source[match.start() : close + 1])
+            if isinstance(node, ast.Call):
+                yield match.start(), node
+
+    def calls(self) -> Iterator[tuple[int, str, dict]]:
+        """``(position, endpoint, arguments)`` for every call the script makes."""
+        for match in _CALL.finditer(self.source):
+            close = _expression_end(self.source, match.end(), closing=True)
+            call = _parse(f"f({self.source[match.end() : close]})")
+            if not isinstance(call, ast.Call):
+                continue
+            endpoint = "/" + match[1].replace(".", "/")
+            headers = self.headers(match.start())
+            functions = [h for h in headers if h[1].startswith("def")]
+            if not functions:
+                for env in self.loops(headers, {}):
+                    yield match.start(), endpoint, self._arguments(call, match, env)
+                continue
+            # A helper: one request for each call of it, with its arguments
+            position, text = functions[0]
+            inner = headers[: headers.index(functions[0])]
+            try:
+                definition = ast.parse(text.split("#")[0].rstrip() + " pass").body[0]
+            except SyntaxError:
+                continue
+            for site, call_site in self.sites(definition.name, position):
+                for env in self.loops(self.headers(site), {}):
+                    bound = _call_env(definition.args, call_site, self, site, env)
+                    for inner_env in self.loops(inner, bound):
+                        yield site, endpoint, self._arguments(call, match, inner_env)
+
+    def functions(self) -> list[dict]:
+        """Schemas for the script's own functions that make no API calls.
+
+        Stands in for function schemas the scraped script lost.
+        """
+        schemas = []
+        for match in _DEF.finditer(self.source):
+            # The body ends at the next line indented no deeper than ``def``
+            dedent = re.compile(rf"\n(?=[ \t]{{0,{len(match[1])}}}[^\s#])")
+            end = dedent.search(self.source, match.end())
+            body = self.source[match.start() : end.start() if end else None]
+            if _CALL.search(body):
+                continue
+            header = body[: _expression_end(body, body.index("(") + 1, True) + 1]
+            definition = _parse(header[header.index("def") + 4 :])
+            if not isinstance(definition, ast.Call):
+                continue
+            docstring = re.search(r'"""(.*?)"""', body, re.DOTALL)
+            parameters = [a.id for a in definition.args if isinstance(a, ast.Name)]
+            schemas.append(
+                {
+                    "name": match[2],
+                    "description": docstring[1].strip() if docstring else match[2],
+                    "parameters": {
+                        "type": "object",
+                        "properties": {p: {"type": "string"} for p in parameters},
+                    },
+                }
+            )
+        return schemas
+
+    def _arguments(self, call: ast.Call, match: re.Match, env: dict) -> dict:
+        return {
+            keyword.arg: self.value(keyword.value, match.start(), env)
+            for keyword in call.keywords
+            if keyword.arg
+        }
+
+
+def _is_call(node: ast.expr, *names: str) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in names
+        and bool(node.args)
+    )
+
+
+def _bind(target: ast.expr, value) -> dict:
+    if isinstance(target, ast.Name):
+        return {target.id: value}
+    if isinstance(target, (ast.Tuple, ast.List)) and isinstance(value, (list, tuple)):
+        bound = {}
+        for element, item in zip(target.elts, value):
+            bound.update(_bind(element, item))
+        return bound
+    return {}
+
+
+def _call_env(
+    arguments: ast.arguments, call: ast.Call, script: Script, site: int, env: dict
+) -> dict:
+    """Parameter values of a helper for one of its call sites."""
+    parameters = [a.arg for a in arguments.args]
+    defaults = arguments.defaults
+    bound = {
+        name: script.value(default, site, {})
+        for name, default in zip(
+            parameters[len(parameters) - len(defaults) :], defaults
+        )
+    }
+    for name, node in zip(parameters, call.args):
+        bound[name] = script.value(node, site, env)
+    for keyword in call.keywords:
+        if keyword.arg:
+            bound[keyword.arg] = script.value(keyword.value, site, env)
+    return bound
+
+
+def _tokens(endpoint: str, body: dict) -> int:
+    model = str(body.get("model", ""))
+    if isinstance(body.get("messages"), list):
+        messages = [m for m in body["messages"] if isinstance(m, dict)]
+        return budget.count_messages(messages, model)
+    return budget.count(str(body.get("prompt", body.get("input", ""))), model)
+
+
+def extract(path: str) -> list[dict]:
+    """The requests ``path`` would make, in the order it makes them."""
+    script = Script(path)
+    requests = []
+    for position, endpoint, body in script.calls():
+        if "file" in body:
+            name = _OPEN.search(str(body["file"]))
+            body["file"] = name[2] if name else str(body["file"])
+        if isinstance(body.get("functions"), str):
+            body["functions"] = script.functions()
+        request = {
+            "source": f"{os.path.relpath(path)}:{script.line(position)}",
+            "endpoint": endpoint,
+            "body": body,
+            "prompt_tokens": _tokens(endpoint, body),
+        }
+        requests.append((position, request))
+    # Helper calls are found per helper; put them back in script order
+    requests.sort(key=lambda item: item[0])
+    return [request for _, request in requests]
+
+
+def load(scripts: tuple[str, ...] = SCRIPTS) -> list[dict]:
+    return [request for path in scripts for request in extract(path)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS)
+    parser.add_argument("-o", "--output", help="JSONL file (default: stdout)")
+    args = parser.parse_args()
+
+    requests = load(tuple(args.scripts))
+    lines = (json.dumps(request, default=str) + "\n" for request in requests)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.writelines(lines)
+    else:
+        sys.stdout.writelines(lines)
+
+
+if __name__ == "__main__":
+    main()